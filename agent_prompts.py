@@ -0,0 +1,29 @@
+"""Prompt assembly that keeps the system prompt a byte-identical prefix across calls.
+
+OpenAI caches prompts by prefix, so anything that changes between calls must come after the static instructions
+and examples. The system prompts are rendered once at import time and volatile data such as the current date and
+time is appended as the last message of every call. The conversation history in between then also stays a stable
+prefix from one turn of an agent loop to the next.
+"""
+from datetime import datetime
+
+from langchain_core.messages import SystemMessage
+
+# Starts the volatile context message, which llm_cache leaves out of its keys
+VOLATILE_CONTEXT_PREFIX = "The current date and time is "
+
+
+def load_system_prompt(path: str, **static_values: str) -> str:
+    """Read a prompt file and fill in its static placeholders (e.g. content examples) once."""
+    with open(path, "r") as f:
+        return f.read().format(**static_values)
+
+
+def build_prompt_messages(system_prompt: str, messages: list) -> list:
+    """Build the messages for an LLM call: static system prompt, conversation history, then volatile context."""
+    return [
+        SystemMessage(content=system_prompt),
+        *messages,
+        SystemMessage(content=f"{VOLATILE_CONTEXT_PREFIX}{datetime.now()}."),
+    ]
+
@@ -0,0 +1,39 @@
+"""Lazy registry of the agent graphs.
+
+Each agent module compiles its graph, builds its ChatOpenAI client and reads its prompt when it is imported, which
+pulls in LangGraph, LangChain and the OpenAI SDK. Code that only sometimes runs an agent gets its graph from here
+instead of importing the module, so that cost is paid on first use (or in a warm-up at startup) rather than by every
+process that imports it, the API server in particular.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+# Agent name -> module that defines its `graph`
+AGENT_MODULES = {
+    "post_generator": "post_generator_agent",
+    "supervisor": "supervisor",
+    "researcher": "researcher",
+    "copywriter": "copywriter",
+}
+
+
+def get_agent_module(name: str):
+    """Import and return the module of agent `name`, with the LLM cache of `LLM_CACHE_MODE` installed."""
+    from llm_cache import install_llm_cache
+
+    install_llm_cache()
+    return importlib.import_module(AGENT_MODULES[name])
+
+
+def get_graph(name: str) -> "CompiledStateGraph":
+    """Return the compiled graph of agent `name`, building it on first use."""
+    return get_agent_module(name).graph
+
+
+def warm_up(*names: str):
+    """Build the graphs of the given agents, or of all of them, ahead of their first use."""
+    for name in names or AGENT_MODULES:
+        get_graph(name)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
@@ -10,6 +10,53 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     TAVILY_API_KEY: str
 
+    # Connection pools of the database engines (see backend/db/database.py)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Store each finished post tree as one compressed blob on its row (see backend/core/post_trees.py)
+    STORE_POST_TREE_BLOBS: bool = True
+
+    # Reuse the post of a job for the same topic that completed this recently, 0 disables (see
+    # backend/core/topic_dedup.py)
+    POST_REUSE_MAX_AGE_SECONDS: float = 0.0
+
+    # How the worker writes posts (see backend/core/post_generator.py): "agents" researches and drafts with the
+    # multi-agent graph first, "structured" writes the tree in a single structured-output call, searching the web
+    # for the topic beforehand when POST_RESEARCH_PREFETCH is on
+    POST_GENERATION_MODE: Literal["agents", "structured"] = "agents"
+    POST_RESEARCH_PREFETCH: bool = True
+    POST_RESEARCH_MAX_RESULTS: int = 5
+    # "whole" writes the post tree in one call. "incremental" writes the title, root node and its options first,
+    # then one node per call: POST_EAGER_EXPANSION_DEPTH levels concurrently per branch before the job completes,
+    # the rest when GET /posts/nodes/{id} first asks for them (see backend/core/post_expansion.py). Nodes at
+    # POST_MAX_DEPTH are always endings.
+    POST_TREE_GENERATION: Literal["whole", "incremental"] = "whole"
+    POST_EAGER_EXPANSION_DEPTH: int = 1
+    POST_MAX_DEPTH: int = 3
+
+    # Cache of serialized posts and nodes served by the API (see backend/core/response_cache.py)
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_MAX_AGE_SECONDS: int = 3600
+
+    # Job queue and worker pool (see backend/worker.py)
+    WORKER_CONCURRENCY: int = 4
+    WORKER_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: int = 300
+    JOB_HEARTBEAT_SECONDS: int = 30
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS: float = 600.0
+
+    # Live job progress (see backend/core/job_events.py)
+    JOB_EVENT_FLUSH_SECONDS: float = 0.25
+    JOB_EVENT_POLL_SECONDS: float = 0.5
+    JOB_EVENT_KEEPALIVE_SECONDS: float = 15.0
+    JOB_EVENT_TTL_SECONDS: float = 24 * 60 * 60
+
     @field_validator("ALLOWED_ORIGINS")
     def parse_allowed_origins(cls, v: str) -> List[str]:
         return v.split(",") if v else []
@@ -0,0 +1,98 @@
+"""Progress events of running jobs, passed from the worker to the API through the `post_job_events` table.
+
+Jobs run in worker processes (see backend/worker.py), so the events a graph produces are written to the database
+by a `JobEventPublisher` and read back by the API's SSE endpoint. Token chunks are coalesced and every write is one
+bulk insert, so a streaming agent costs a few inserts per second rather than one per token.
+
+Events of finished jobs are deleted by `prune_events` once `JOB_EVENT_TTL_SECONDS` has passed.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.db.database import SessionLocal
+from backend.models.job import PostJob, PostJobEvent
+
+logger = logging.getLogger(__name__)
+
+# Events after which a job produces nothing more
+TERMINAL_EVENTS = {"completed", "failed"}
+
+
+class JobEventPublisher:
+    """Buffers a job's events and writes them in batches.
+
+    Consecutive token events of the same agent are merged and written at most every `JOB_EVENT_FLUSH_SECONDS`,
+    any other event flushes the buffer right away.
+
+    Args:
+        job_id: The public id of the job the events belong to.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._buffer: list[dict] = []
+        self._last_flush = time.monotonic()
+
+    async def publish(self, event: dict):
+        """Queue an event, as produced by `graph_events.stream_graph_events` or a job status change."""
+        previous = self._buffer[-1] if self._buffer else None
+        if (
+                event["type"] == "token" and previous is not None and previous["type"] == "token"
+                and previous.get("agent") == event.get("agent")
+        ):
+            previous["text"] += event["text"]
+        else:
+            self._buffer.append(dict(event))
+
+        if event["type"] != "token" or time.monotonic() - self._last_flush >= settings.JOB_EVENT_FLUSH_SECONDS:
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        events, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        try:
+            await asyncio.to_thread(_write_events, self.job_id, events)
+        except Exception:
+            # Progress events are best effort, never fail the job over them
+            logger.exception("Could not write %d events of job %s", len(events), self.job_id)
+
+
+def _write_events(job_id: str, events: list[dict]):
+    db = SessionLocal()
+    try:
+        db.execute(insert(PostJobEvent), [
+            {"job_id": job_id, "type": event["type"], "data": {k: v for k, v in event.items() if k != "type"}}
+            for event in events
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def fetch_events(db: AsyncSession, job_id: str, after_id: int = 0, limit: int = 100) -> list[PostJobEvent]:
+    """Return up to `limit` events of a job with an id greater than `after_id`, oldest first."""
+    return (await db.scalars(
+        select(PostJobEvent)
+        .where(PostJobEvent.job_id == job_id, PostJobEvent.id > after_id)
+        .order_by(PostJobEvent.id)
+        .limit(limit)
+    )).all()
+
+
+def prune_events(db: Session, ttl_seconds: float = None) -> int:
+    """Delete the events of jobs that finished more than `ttl_seconds` ago. Returns the number of rows deleted."""
+    ttl_seconds = settings.JOB_EVENT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+    finished = select(PostJob.job_id).where(PostJob.status.in_(TERMINAL_EVENTS), PostJob.completed_at < cutoff)
+    result = db.execute(delete(PostJobEvent).where(PostJobEvent.job_id.in_(finished)))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,137 @@
+"""A durable job queue backed by the `post_jobs` table.
+
+Jobs are claimed with a lease by a worker (see backend/worker.py). The worker renews the lease with heartbeats
+while the job runs. If a worker dies, its lease expires and the job is picked up again by another worker. Only the
+worker holding the lease can complete or fail a job. Failed jobs are retried with exponential backoff until
+`JOB_MAX_ATTEMPTS` is reached.
+
+Claims are an optimistic `UPDATE ... WHERE` on the job's claimable state, so they are safe across processes on both
+SQLite and Postgres without row locks.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.models.job import PostJob
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _claimable(now: datetime):
+    """Pending jobs that are due, and processing jobs whose worker stopped renewing the lease."""
+    return or_(
+        and_(
+            PostJob.status == "pending",
+            or_(PostJob.run_after.is_(None), PostJob.run_after <= now),
+        ),
+        and_(
+            PostJob.status == "processing",
+            or_(PostJob.lease_expires_at.is_(None), PostJob.lease_expires_at < now),
+        ),
+    )
+
+
+def claim_next_job(db: Session, worker_id: str) -> PostJob | None:
+    """Lease the oldest claimable job to `worker_id`, or return None if there is nothing to do."""
+    now = _utcnow()
+    candidates = db.scalars(
+        select(PostJob.id).where(_claimable(now)).order_by(PostJob.created_at, PostJob.id).limit(10)
+    ).all()
+
+    for job_pk in candidates:
+        result = db.execute(
+            update(PostJob)
+            .where(PostJob.id == job_pk, _claimable(now))
+            .values(
+                status="processing",
+                locked_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                heartbeat_at=now,
+                attempts=func.coalesce(PostJob.attempts, 0) + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            # Another worker claimed it first
+            continue
+
+        job = db.get(PostJob, job_pk, populate_existing=True)
+        if job.attempts > settings.JOB_MAX_ATTEMPTS:
+            # The job keeps taking its worker down with it, stop recovering it
+            _finish(db, job, worker_id, status="failed", error=job.error or "Exceeded the maximum number of attempts")
+            continue
+        return job
+
+    return None
+
+
+def _held_by(job: PostJob, worker_id: str):
+    return and_(PostJob.id == job.id, PostJob.status == "processing", PostJob.locked_by == worker_id)
+
+
+def heartbeat(db: Session, job: PostJob, worker_id: str) -> bool:
+    """Extend the lease on a running job. Returns False if the lease was lost to another worker."""
+    now = _utcnow()
+    result = db.execute(
+        update(PostJob)
+        .where(_held_by(job, worker_id))
+        .values(
+            heartbeat_at=now,
+            lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def complete_job(db: Session, job: PostJob, worker_id: str, post_id: int) -> bool:
+    """Record the job's post. Returns False, writing nothing, if `worker_id` no longer holds the lease."""
+    return _finish(db, job, worker_id, status="completed", post_id=post_id, error=None)
+
+
+def fail_job(db: Session, job: PostJob, worker_id: str, error: str) -> bool:
+    """Record a failed attempt and schedule a retry with exponential backoff, or fail the job for good.
+
+    Returns False, writing nothing, if `worker_id` no longer holds the lease.
+    """
+    if (job.attempts or 0) < settings.JOB_MAX_ATTEMPTS:
+        backoff = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** ((job.attempts or 1) - 1)
+        return _update_held(
+            db, job, worker_id,
+            status="pending",
+            error=error,
+            run_after=_utcnow() + timedelta(seconds=backoff),
+            locked_by=None,
+            lease_expires_at=None,
+        )
+    return _finish(db, job, worker_id, status="failed", error=error)
+
+
+def _finish(db: Session, job: PostJob, worker_id: str, **values) -> bool:
+    return _update_held(
+        db, job, worker_id, completed_at=_utcnow(), locked_by=None, lease_expires_at=None, **values
+    )
+
+
+def _update_held(db: Session, job: PostJob, worker_id: str, **values) -> bool:
+    """Update a job only while `worker_id` holds its lease, with the session's pending changes to it.
+
+    A worker whose lease expired may still be running the job while another one runs it again, only the lease
+    holder's outcome is kept. Otherwise the session is rolled back and False returned.
+    """
+    result = db.execute(
+        update(PostJob).where(_held_by(job, worker_id)).values(**values).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return False
+    db.commit()
+    # Let the next access read the values just written
+    db.expire(job)
+    return True
@@ -0,0 +1,123 @@
+"""Storing the agents' telemetry of each job, and exporting it as Prometheus metrics.
+
+The worker passes a `telemetry.RunTelemetry` to every run and, once the attempt is over, `record_job_telemetry` stores
+its summary in `post_jobs.telemetry` and adds it to the cumulative counters in `agent_usage_totals`. The agents run in
+worker processes, so those counters are what lets `GET /metrics` on the API report them; `render_usage_metrics`
+renders them in the Prometheus text format, next to the API's own in-process metrics.
+"""
+import re
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models.job import AgentUsageTotal, PostJob
+from metrics import format_labels
+
+if TYPE_CHECKING:
+    # Imports LangChain, which the API process doesn't need to render the totals
+    from telemetry import RunTelemetry
+
+# Metric name -> (Prometheus type, help). Summaries are stored as their _sum and _count samples, histograms also as
+# their cumulative _bucket samples.
+USAGE_METRICS = {
+    "agent_llm_calls_total": ("counter", "LLM calls made by each agent."),
+    "agent_prompt_tokens_total": ("counter", "Prompt tokens sent by each agent, cached ones included."),
+    "agent_cached_tokens_total": ("counter", "Prompt tokens of each agent served from the provider's prompt cache."),
+    "agent_completion_tokens_total": ("counter", "Completion tokens generated by each agent."),
+    "agent_cost_usd_total": ("counter", "Estimated LLM cost of each agent in US dollars."),
+    "agent_llm_call_seconds": ("summary", "Wall time of the LLM calls of each agent."),
+    "agent_time_to_first_token_seconds": ("summary", "Time to the first token of the streamed LLM calls of each agent."),
+    "agent_history_tokens_saved_total": ("counter", "Prompt tokens each agent's history compaction left out."),
+    "agent_history_compactions_total": ("counter", "LLM calls of each agent whose history had to be compacted."),
+    "research_cache_lookups_total": ("counter", "Research cache lookups of searches and extractions, by result."),
+    "agent_tool_latency_seconds": ("histogram", "Latency of agent tool calls, by tool and outcome."),
+    "post_job_attempt_seconds": ("summary", "Wall time of job attempts, by outcome."),
+}
+
+# Upper bounds of the buckets of agent_tool_latency_seconds
+TOOL_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def usage_increments(telemetry: "RunTelemetry", outcome: str) -> dict[tuple[str, str], float]:
+    """The amounts one attempt adds to each (sample name, labels) counter."""
+    increments = defaultdict(float)
+    for call in telemetry.calls:
+        labels = format_labels((("agent", call["agent"]),))
+        increments["agent_llm_calls_total", labels] += 1
+        increments["agent_prompt_tokens_total", labels] += call["prompt_tokens"]
+        increments["agent_cached_tokens_total", labels] += call["cached_tokens"]
+        increments["agent_completion_tokens_total", labels] += call["completion_tokens"]
+        increments["agent_cost_usd_total", labels] += call["cost_usd"]
+        increments["agent_llm_call_seconds_sum", labels] += call["seconds"]
+        increments["agent_llm_call_seconds_count", labels] += 1
+        if call["time_to_first_token"] is not None:
+            increments["agent_time_to_first_token_seconds_sum", labels] += call["time_to_first_token"]
+            increments["agent_time_to_first_token_seconds_count", labels] += 1
+
+    for agent, totals in telemetry.history_compaction.items():
+        labels = format_labels((("agent", agent),))
+        increments["agent_history_tokens_saved_total", labels] += totals["tokens_saved"]
+        increments["agent_history_compactions_total", labels] += totals["compacted_calls"]
+
+    for kind, totals in telemetry.research_cache.items():
+        for result, count in (("hit", totals["hits"]), ("miss", totals["misses"])):
+            increments["research_cache_lookups_total", format_labels((("kind", kind), ("result", result)))] += count
+
+    for call in telemetry.tool_calls:
+        series = (("outcome", call["outcome"]), ("tool", call["tool"]))
+        # Every bucket of the series is written, also the ones the call doesn't count in
+        for bound in TOOL_LATENCY_BUCKETS:
+            increments["agent_tool_latency_seconds_bucket", format_labels((*series, ("le", f"{bound:g}")))] += (
+                call["seconds"] <= bound
+            )
+        increments["agent_tool_latency_seconds_bucket", format_labels((*series, ("le", "+Inf")))] += 1
+        increments["agent_tool_latency_seconds_sum", format_labels(series)] += call["seconds"]
+        increments["agent_tool_latency_seconds_count", format_labels(series)] += 1
+
+    labels = format_labels((("outcome", outcome),))
+    increments["post_job_attempt_seconds_sum", labels] += time.perf_counter() - telemetry.started
+    increments["post_job_attempt_seconds_count", labels] += 1
+    return increments
+
+
+def record_job_telemetry(db: Session, job: PostJob, telemetry: "RunTelemetry", outcome: str):
+    """Store the telemetry of the job's current attempt and add it to the usage totals. The caller commits."""
+    summary = telemetry.summary()
+    job.telemetry = {"attempt": job.attempts, "outcome": outcome, **summary}
+
+    increments = usage_increments(telemetry, outcome)
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = insert(AgentUsageTotal).values([
+        {"name": name, "labels": labels, "value": value} for (name, labels), value in increments.items()
+    ])
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["name", "labels"],
+        set_={"value": AgentUsageTotal.value + statement.excluded.value},
+    ))
+
+
+def _sample_order(total: AgentUsageTotal) -> tuple:
+    """Sort samples by name and series, and the buckets of a series by their upper bound rather than as text."""
+    match = re.search(r',le="([^"]+)"', total.labels)
+    if match is None:
+        return total.name, total.labels, 0.0
+    return total.name, total.labels.replace(match.group(0), ""), float(match.group(1))
+
+
+async def render_usage_metrics(db: AsyncSession) -> str:
+    """Render the usage totals of every job in the Prometheus text format."""
+    samples = defaultdict(list)
+    for total in sorted(await db.scalars(select(AgentUsageTotal)), key=_sample_order):
+        base = total.name.removesuffix("_bucket").removesuffix("_sum").removesuffix("_count")
+        samples[base if base in USAGE_METRICS else total.name].append(total)
+
+    lines = []
+    for name, (metric_type, documentation) in USAGE_METRICS.items():
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+        lines += [f"{total.name}{total.labels} {total.value}" for total in samples[name]]
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,10 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 class PostOptionLLM(BaseModel):
     text: str = Field(description="the text of the option shown to the user")
-    nextNode: Dict[str, Any] = Field(description="the next node content and its options")
+    # A typed, recursive node rather than a free-form dict, so the schema can be enforced by structured output
+    nextNode: "PostNodeLLM" = Field(description="the next node content and its options")
 
 class PostNodeLLM(BaseModel):
     content: str = Field(description="the main content of the post node")
@@ -12,4 +13,18 @@ class PostNodeLLM(BaseModel):
 
 class PostLLMResponse(BaseModel):
     title: str = Field(description="the title of the post")
-    rootNode: PostNodeLLM = Field(description="the root node of the post")
\ No newline at end of file
+    rootNode: PostNodeLLM = Field(description="the root node of the post")
+
+class PostBranchLLM(BaseModel):
+    text: str = Field(description="the text of the option shown to the user")
+    brief: str = Field(description="what the node this option leads to should cover, in one or two sentences")
+
+class PostLevelLLM(BaseModel):
+    """One node of an incrementally generated post, with its options but not the nodes they lead to"""
+    content: str = Field(description="the main content of the post node")
+    isEnding: bool = Field(description="whether this node is an ending node")
+    options: List[PostBranchLLM] = Field(description="the options for this node, empty for ending nodes")
+
+class PostRootLLM(BaseModel):
+    title: str = Field(description="the title of the post")
+    rootNode: PostLevelLLM = Field(description="the root node of the post")
@@ -0,0 +1,175 @@
+"""Incremental, level-by-level generation of post trees.
+
+Writing a whole choose-your-own-adventure tree in one response makes latency and output tokens grow exponentially
+with its depth, and nothing can be shown before the last node is written. With `POST_TREE_GENERATION=incremental` the
+worker writes only the title, the root node and its options in the first call, and stores the nodes the options
+lead to as pending rows: `is_expanded` false, with the brief the model wrote for each option. `expand_node` writes a
+pending node in a call of its own, from the topic and research kept on the post and the path from the root, and
+stores its options as new pending nodes in turn. Nodes at `POST_MAX_DEPTH` are always endings.
+
+The worker expands `POST_EAGER_EXPANSION_DEPTH` levels, concurrently per branch, before completing the job. Deeper
+nodes are written the first time `GET /posts/nodes/{id}` asks for them.
+
+A post with pending nodes changes as they are written, so the API doesn't cache it (see response_cache.py) and it has
+no tree blob until its last pending node is written. Concurrent expansions of a node in one process share one LLM
+call. Across processes, the update claiming the node lets only the first expansion store its result.
+"""
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from sqlalchemy import insert, select, update
+
+from backend.core.config import settings
+from backend.core.models import PostBranchLLM, PostLevelLLM
+from backend.core.post_trees import assemble_complete_post, encode_post_tree
+from backend.db.database import SessionLocal
+from backend.models.post import Post, PostNode
+
+if TYPE_CHECKING:
+    # Imports LangChain, which the API process only needs once it expands a node
+    from telemetry import RunTelemetry
+
+logger = logging.getLogger(__name__)
+
+# Expansions running in each event loop, by node id
+_inflight: dict[tuple[asyncio.AbstractEventLoop, int], asyncio.Task] = {}
+
+
+def is_ending(node: PostLevelLLM, depth: int) -> bool:
+    return node.isEnding or not node.options or depth >= settings.POST_MAX_DEPTH
+
+
+def node_options(branches: list[PostBranchLLM], node_ids: list[int]) -> list[dict]:
+    return [{"text": branch.text, "node_id": node_id} for branch, node_id in zip(branches, node_ids)]
+
+
+def pending_node_rows(post_id: int, parent_id: int, branches: list[PostBranchLLM], node_ids: list[int]) -> list[dict]:
+    """Rows of the pending nodes that `branches` lead to, with the reserved `node_ids`."""
+    return [
+        {
+            "id": node_id,
+            "post_id": post_id,
+            "parent_id": parent_id,
+            "content": "",
+            "is_root": False,
+            "is_ending": False,
+            "is_expanded": False,
+            "options": [],
+            "brief": branch.brief,
+        }
+        for branch, node_id in zip(branches, node_ids)
+    ]
+
+
+def load_expansion_context(node_id: int) -> dict | None:
+    """What the model needs to write pending node `node_id`, or None if the node doesn't exist or isn't pending."""
+    with SessionLocal() as db:
+        node = db.get(PostNode, node_id)
+        if node is None or node.is_expanded is not False:
+            return None
+        post = db.get(Post, node.post_id)
+        nodes = {other.id: other for other in db.scalars(select(PostNode).where(PostNode.post_id == post.id))}
+
+        # (content, chosen option) of every node from the root down to the node's parent
+        path = []
+        child = node
+        while child.parent_id is not None:
+            parent = nodes[child.parent_id]
+            option = next(option["text"] for option in parent.options if option["node_id"] == child.id)
+            path.append((parent.content, option))
+            child = parent
+        path.reverse()
+
+        return {
+            "title": post.title,
+            "topic": post.generation_context["topic"],
+            "research": post.generation_context["research"],
+            "path": path,
+            "brief": node.brief,
+            "depth": len(path),
+        }
+
+
+def store_expansion(node_id: int, node: PostLevelLLM, depth: int) -> list[int] | None:
+    """Store the written node and its options as new pending nodes.
+
+    Returns the ids of the new pending nodes, or None when another expansion stored the node first.
+    """
+    from backend.core.post_generator import PostGenerator
+
+    with SessionLocal() as db:
+        # Claiming the node also takes SQLite's write lock, which reserving node ids relies on
+        claimed = db.execute(
+            update(PostNode).where(PostNode.id == node_id, PostNode.is_expanded.is_(False)).values(is_expanded=True)
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            return None
+
+        post_id = db.scalar(select(PostNode.post_id).where(PostNode.id == node_id))
+        branches = [] if is_ending(node, depth) else node.options
+        child_ids = PostGenerator._reserve_node_ids(db, len(branches))
+        if branches:
+            db.execute(insert(PostNode), pending_node_rows(post_id, node_id, branches, child_ids))
+        db.execute(update(PostNode).where(PostNode.id == node_id).values(
+            content=node.content,
+            is_ending=not branches,
+            options=node_options(branches, child_ids),
+            brief=None,
+        ))
+
+        pending = db.scalar(select(PostNode.id).where(PostNode.post_id == post_id, PostNode.is_expanded.is_(False)))
+        if pending is not None:
+            # The node updates above are Core statements, which don't clear the blob like ORM updates do
+            db.execute(update(Post).where(Post.id == post_id).values(complete_tree=None))
+        elif settings.STORE_POST_TREE_BLOBS:
+            post = db.get(Post, post_id)
+            nodes = db.scalars(select(PostNode).where(PostNode.post_id == post_id).order_by(PostNode.id)).all()
+            post.complete_tree = encode_post_tree(assemble_complete_post(post, nodes))
+        db.commit()
+        return child_ids
+
+
+async def _expand(node_id: int, telemetry: "RunTelemetry | None") -> list[int] | None:
+    from backend.core.post_generator import PostGenerator
+
+    context = await asyncio.to_thread(load_expansion_context, node_id)
+    if context is None:
+        return None
+    node = await PostGenerator.generate_post_node(context, telemetry)
+    return await asyncio.to_thread(store_expansion, node_id, node, context["depth"])
+
+
+async def expand_node(node_id: int, telemetry: "RunTelemetry | None" = None) -> list[int] | None:
+    """Write pending node `node_id`.
+
+    Returns the ids of the pending nodes its options lead to, or None if the node wasn't pending or another process
+    wrote it first. Callers expanding the same node in this event loop share one expansion.
+    """
+    key = (asyncio.get_running_loop(), node_id)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_expand(node_id, telemetry))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # A caller that goes away, like a client disconnecting, doesn't cancel the expansion for the others
+    return await asyncio.shield(task)
+
+
+async def expand_levels(node_ids: list[int], levels: int, telemetry: "RunTelemetry | None" = None):
+    """Expand pending nodes `node_ids` and the nodes below them, `levels` deep, every branch concurrently.
+
+    A branch that fails is logged and left pending, to be expanded when it is first requested.
+    """
+    if levels <= 0 or not node_ids:
+        return
+
+    async def expand_branch(node_id: int):
+        child_ids = await expand_node(node_id, telemetry)
+        await expand_levels(child_ids or [], levels - 1, telemetry)
+
+    results = await asyncio.gather(*(expand_branch(node_id) for node_id in node_ids), return_exceptions=True)
+    for node_id, result in zip(node_ids, results):
+        if isinstance(result, Exception):
+            logger.warning("Could not expand node %s, leaving it pending", node_id, exc_info=result)
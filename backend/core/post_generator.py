@@ -1,19 +1,36 @@
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, insert, select, text
 from sqlalchemy.orm import Session
 
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel
 
-from backend.core.models import PostLLMResponse, PostNodeLLM
+from backend.core.config import settings
+from backend.core.models import PostLevelLLM, PostLLMResponse, PostNodeLLM, PostRootLLM
+from backend.core.post_expansion import expand_levels, is_ending, node_options, pending_node_rows
+from backend.core.post_trees import assemble_complete_post, encode_post_tree
 from backend.models.post import Post, PostNode
+from llm_cache import install_llm_cache
+from telemetry import RunTelemetry
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Fills the prompt's format placeholder: the response format already carries the schema and enforces it
+STRUCTURED_FORMAT_INSTRUCTIONS = "the JSON schema of the response format, which describes every field"
+
 class PostGenerator:
 
     @classmethod
     def _get_llm(cls):
+        install_llm_cache()
         return ChatOpenAI(
             name="Post Generator",
             model="gpt-5-mini-2025-08-07",
@@ -21,69 +38,236 @@ class PostGenerator:
         )
 
     @classmethod
-    def generate_post(cls, db: Session, session_id: str, topic: str = "social media content") -> Post:
-        """Generate an interactive post using the multi-agent system."""
+    async def generate_post(
+            cls,
+            db: Session,
+            session_id: str,
+            topic: str = "social media content",
+            on_event: Callable[[dict], Awaitable[None]] | None = None,
+            telemetry: RunTelemetry | None = None,
+            run_id: str | None = None,
+    ) -> Post:
+        """Generate an interactive post and store it.
+
+        The post tree is written by structured-output calls: all of it in one (`_generate_post_structure`), or with
+        `POST_TREE_GENERATION=incremental` the root first and the nodes below one per call (see post_expansion.py).
+        What it is grounded in depends on `POST_GENERATION_MODE`: the research reports of a multi-agent graph run
+        (`agents`), or a single web search for the topic (`structured`, when `POST_RESEARCH_PREFETCH` is on).
+
+        If `on_event` is given, progress events are passed to it (see graph_events.py). Tokens and latencies of
+        every LLM and tool call are recorded in `telemetry` (see telemetry.py).
+
+        The agents run on the checkpoint thread of `run_id`, like the job's id, or on a new thread when it's None.
+        Runs never share a thread, or the research reports of earlier posts would leak into this one.
+
+        `db` is only used from worker threads, so a write waiting on the database doesn't block the event loop.
+        """
+        if telemetry is None:
+            telemetry = RunTelemetry()
+
+        if settings.POST_GENERATION_MODE == "structured":
+            research = []
+            if settings.POST_RESEARCH_PREFETCH:
+                await cls._emit(on_event, "prefetch_research")
+                research = await cls._prefetch_research(topic, telemetry)
+        else:
+            research = await cls._run_agents(run_id or uuid.uuid4().hex, topic, on_event, telemetry)
+
+        await cls._emit(on_event, "generate_post")
+        if settings.POST_TREE_GENERATION == "incremental":
+            root = await cls._generate_post_root(topic, research, telemetry)
+            post, pending_ids = await asyncio.to_thread(cls._store_post_root, db, session_id, topic, research, root)
+            await expand_levels(pending_ids, settings.POST_EAGER_EXPANSION_DEPTH, telemetry)
+        else:
+            post_structure = await cls._generate_post_structure(topic, research, telemetry)
+            post = await asyncio.to_thread(cls._store_generated_post, db, session_id, post_structure)
+
+        usage = telemetry.summary()
+        logger.info(
+            "Post generation for session %s: %d LLM calls, %d/%d prompt tokens served from cache, ~$%.4f",
+            session_id,
+            len(telemetry.calls),
+            usage["cached_tokens"],
+            usage["prompt_tokens"],
+            usage["cost_usd"],
+        )
+        return post
+
+    @classmethod
+    async def _emit(cls, on_event: Callable[[dict], Awaitable[None]] | None, node: str):
+        if on_event is not None:
+            await on_event({"type": "node", "agent": "PostGenerator", "node": node})
+
+    @classmethod
+    async def _run_agents(
+            cls,
+            run_id: str,
+            topic: str,
+            on_event: Callable[[dict], Awaitable[None]] | None,
+            telemetry: RunTelemetry,
+    ) -> list[dict]:
+        """Run the multi-agent system for `topic` and return the research reports it gathered."""
         # Import here to avoid circular imports
-        from post_generator_agent import graph as post_generator_graph, PostGeneratorState
-        from langchain_core.messages import HumanMessage
+        from agents import get_agent_module
         from langgraph.types import RunnableConfig
-        import asyncio
-        
+        from checkpointer import checkpointer
+        from graph_events import stream_graph_events
+
+        post_generator_agent = get_agent_module("post_generator")
+        post_generator_graph = post_generator_agent.graph
+
         # Create the input for the post generator agent
-        agent_input = PostGeneratorState(
+        agent_input = post_generator_agent.PostGeneratorState(
             messages=[HumanMessage(content=f"Create a social media post with topic: {topic}")]
         )
         
         # Configure the agent run
-        config = RunnableConfig(configurable={
-            "thread_id": f"post_gen_{session_id}",
-            "recursion_limit": 50,
-        })
-        
-        # Run the multi-agent system
-        async def run_agents():
-            return await post_generator_graph.ainvoke(agent_input, config=config)
-        
-        # Execute the async function
-        result = asyncio.run(run_agents())
-        
-        # Extract the final content from the agent response
-        final_content = result.get("final_content")
-        if not final_content:
-            # Fallback to direct generation if agent system doesn't provide content
-            return cls._generate_post_directly(db, session_id, topic)
+        thread_id = f"post_gen_{run_id}"
+        config = RunnableConfig(
+            configurable={
+                "thread_id": thread_id,
+                "recursion_limit": 50,
+            },
+            callbacks=[telemetry],
+        )
         
-        # Parse and store the generated content
-        return cls._store_generated_post(db, session_id, final_content)
-
-    @classmethod
-    def _generate_post_directly(cls, db: Session, session_id: str, topic: str) -> Post:
-        """Fallback method for direct post generation without multi-agent system."""
-        llm = cls._get_llm()
-        post_parser = PydanticOutputParser(pydantic_object=PostLLMResponse)
-
-        # Load the post generation prompt
-        post_prompt = cls._get_post_prompt()
-
-        prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                post_prompt
-            ),
-            (
-                "human",
-                f"Create a post with this topic: {topic}"
+        # Run the multi-agent system. The thread is finished however the run ends, since a retry runs on a new one.
+        try:
+            if on_event is None:
+                result = await post_generator_graph.ainvoke(agent_input, config=config)
+            else:
+                result = await stream_graph_events(
+                    post_generator_graph, agent_input, on_event, root_agent="PostGenerator", config=config
+                )
+        finally:
+            await checkpointer.mark_thread_finished(thread_id)
+
+        return [
+            report.model_dump() if hasattr(report, "model_dump") else report
+            for report in result.get("research_reports", [])
+        ]
+
+    @classmethod
+    async def _prefetch_research(cls, topic: str, telemetry: RunTelemetry) -> list[dict]:
+        """Search the web for `topic` and return the results as research reports, or none if the search fails.
+
+        No LLM is involved, the model reads the search results when it writes the post.
+        """
+        from langchain_core.runnables import RunnableLambda
+        from tavily_client import get_tavily_client
+
+        async def search(query: str) -> dict:
+            return await get_tavily_client().search(query, max_results=settings.POST_RESEARCH_MAX_RESULTS)
+
+        try:
+            # Run as a step of its own, so the search's research cache lookup is reported to `telemetry`
+            response = await RunnableLambda(search, name="research_prefetch").ainvoke(
+                topic, {"callbacks": [telemetry]}
             )
-        ]).partial(format_instructions=post_parser.get_format_instructions())
+        except Exception:
+            logger.warning("Research prefetch for %r failed, writing the post without it", topic, exc_info=True)
+            return []
+        return [
+            {"topic": result["title"], "report": f"{result['content']}\nSource: {result['url']}"}
+            for result in response["results"]
+        ]
 
-        raw_response = llm.invoke(prompt.invoke({}))
+    @classmethod
+    async def _generate_post_structure(
+            cls, topic: str, research: list[dict], telemetry: RunTelemetry | None = None
+    ) -> PostLLMResponse:
+        """Write the post tree in one call, with the response constrained to the JSON schema of `PostLLMResponse`."""
+        llm = cls._get_llm().with_structured_output(PostLLMResponse, method="json_schema", strict=True)
 
-        response_text = raw_response
-        if hasattr(raw_response, "content"):
-            response_text = raw_response.content
+        # The system prompt stays the same for every post, so the provider can cache it. It is not a prompt
+        # template: its JSON example is full of braces, so only the format instructions are filled in.
+        post_prompt = cls._get_post_prompt().replace("{format_instructions}", STRUCTURED_FORMAT_INSTRUCTIONS)
+        prompt = [
+            SystemMessage(content=post_prompt),
+            HumanMessage(content=f"Create a post with this topic: {topic}{cls._research_context(research)}"),
+        ]
 
-        post_structure = post_parser.parse(response_text)
-        return cls._store_generated_post(db, session_id, post_structure)
+        return await llm.ainvoke(prompt, config={"callbacks": [telemetry]} if telemetry else None)
+
+    @classmethod
+    async def _generate_post_root(
+            cls, topic: str, research: list[dict], telemetry: RunTelemetry | None = None
+    ) -> PostRootLLM:
+        """Write the title and root node of an incrementally generated post, with a brief for each option."""
+        request = (
+            f"Create a new post with this topic: {topic}{cls._research_context(research)}\n\n"
+            f"Write its title and root node. The root node is at depth 0 of at most {settings.POST_MAX_DEPTH}."
+        )
+        return await cls._generate_node(PostRootLLM, request, telemetry)
+
+    @classmethod
+    async def generate_post_node(cls, context: dict, telemetry: RunTelemetry | None = None) -> PostLevelLLM:
+        """Write a pending node of an incrementally generated post, from the context built by
+        `post_expansion.load_expansion_context`."""
+        path = "\n\n".join(
+            f"Node at depth {depth}:\n{content}\n\nChosen option: {option}"
+            for depth, (content, option) in enumerate(context["path"])
+        )
+        request = (
+            f"The post is titled \"{context['title']}\" and has this topic: {context['topic']}"
+            f"{cls._research_context(context['research'])}\n\n"
+            f"The path the reader took:\n\n{path}\n\n"
+            f"Write the node the last chosen option leads to. Its brief: {context['brief']}\n"
+            f"The node is at depth {context['depth']} of at most {settings.POST_MAX_DEPTH}."
+        )
+        return await cls._generate_node(PostLevelLLM, request, telemetry)
+
+    @classmethod
+    async def _generate_node(cls, schema: type[BaseModel], request: str, telemetry: RunTelemetry | None):
+        llm = cls._get_llm().with_structured_output(schema, method="json_schema", strict=True)
+        # The system prompt is the same for every node, and the research for every node of a post, so both stay a
+        # cacheable prefix
+        prompt = [
+            SystemMessage(content=cls._get_node_prompt()),
+            HumanMessage(content=request),
+        ]
+        return await llm.ainvoke(prompt, config={"callbacks": [telemetry]} if telemetry else None)
+
+    @classmethod
+    def _research_context(cls, research: list[dict]) -> str:
+        if not research:
+            return ""
+        reports = "\n\n".join(f"## {report['topic']}\n{report['report']}" for report in research)
+        return f"\n\nBase it on this research:\n\n{reports}"
+
+    @classmethod
+    def _store_post_root(
+            cls, db: Session, session_id: str, topic: str, research: list[dict], root: PostRootLLM
+    ) -> tuple[Post, list[int]]:
+        """Store the post and its root node, with the nodes its options lead to as pending nodes.
+
+        Returns the post and the ids of the pending nodes.
+        """
+        post_db = Post(
+            title=root.title,
+            session_id=session_id,
+            generation_context={"topic": topic, "research": research},
+        )
+        db.add(post_db)
+        db.flush()
+
+        branches = [] if is_ending(root.rootNode, 0) else root.rootNode.options
+        root_id, *child_ids = cls._reserve_node_ids(db, 1 + len(branches))
+        db.execute(insert(PostNode), [
+            {
+                "id": root_id,
+                "post_id": post_db.id,
+                "content": root.rootNode.content,
+                "is_root": True,
+                "is_ending": not branches,
+                "is_expanded": True,
+                "options": node_options(branches, child_ids),
+            },
+            *pending_node_rows(post_db.id, root_id, branches, child_ids),
+        ])
+        # The tree blob is stored once every pending node has been written
+        db.commit()
+        return post_db, child_ids
 
     @classmethod
     def _store_generated_post(cls, db: Session, session_id: str, post_data) -> Post:
@@ -93,6 +277,9 @@ class PostGenerator:
             import json
             post_data = json.loads(post_data)
         
+        if isinstance(post_data, PostLLMResponse):
+            post_data = post_data.model_dump()
+
         if not isinstance(post_data, dict):
             raise ValueError("Invalid post data format")
 
@@ -104,42 +291,80 @@ class PostGenerator:
         if isinstance(root_node_data, dict):
             root_node_data = PostNodeLLM.model_validate(root_node_data)
 
-        cls._process_post_node(db, post_db.id, root_node_data, is_root=True)
+        cls._store_post_nodes(db, post_db.id, root_node_data)
+
+        if settings.STORE_POST_TREE_BLOBS:
+            # Read the rows back rather than building from the LLM data, so the blob matches what the rows serve
+            nodes = db.scalars(select(PostNode).where(PostNode.post_id == post_db.id).order_by(PostNode.id)).all()
+            post_db.complete_tree = encode_post_tree(assemble_complete_post(post_db, nodes))
 
         db.commit()
         return post_db
 
     @classmethod
-    def _process_post_node(cls, db: Session, post_id: int, node_data: PostNodeLLM, is_root: bool = False) -> PostNode:
-        node = PostNode(
-            post_id=post_id,
-            content=node_data.content if hasattr(node_data, "content") else node_data["content"],
-            is_root=is_root,
-            is_ending=node_data.isEnding if hasattr(node_data, "isEnding") else node_data["isEnding"],
-            options=[]
-        )
-        db.add(node)
-        db.flush()
+    def _store_post_nodes(cls, db: Session, post_id: int, root_node_data: PostNodeLLM):
+        """Store a whole node tree with a single bulk INSERT.
 
-        if not node.is_ending and (hasattr(node_data, "options") and node_data.options):
-            options_list = []
-            for option_data in node_data.options:
-                next_node = option_data.nextNode
+        Node ids are reserved up front, so every node's options can reference its children's ids before anything
+        is written, instead of flushing each node to learn its id.
+        """
+        nodes = cls._flatten_post_tree(root_node_data)
+        node_ids = cls._reserve_node_ids(db, len(nodes))
 
-                if isinstance(next_node, dict):
-                    next_node = PostNodeLLM.model_validate(next_node)
+        rows = []
+        for index, (node_data, node_children) in enumerate(nodes):
+            rows.append({
+                "id": node_ids[index],
+                "post_id": post_id,
+                "content": node_data.content,
+                "is_root": index == 0,
+                "is_ending": node_data.isEnding,
+                "options": [{"text": text, "node_id": node_ids[child]} for text, child in node_children],
+            })
 
-                child_node = cls._process_post_node(db, post_id, next_node, False)
+        db.execute(insert(PostNode), rows)
 
-                options_list.append({
-                    "text": option_data.text,
-                    "node_id": child_node.id
-                })
+    @classmethod
+    def _flatten_post_tree(cls, root_node_data: PostNodeLLM) -> list[tuple[PostNodeLLM, list[tuple[str, int]]]]:
+        """Flatten a node tree breadth-first.
 
-            node.options = options_list
+        Returns each node with a list of (option text, index of the child node in the returned list).
+        """
+        nodes = []
+        queue = [root_node_data]
 
-        db.flush()
-        return node
+        for node_data in queue:
+            node_children = []
+            if not node_data.isEnding and node_data.options:
+                for option_data in node_data.options:
+                    next_node = option_data.nextNode
+                    if isinstance(next_node, dict):
+                        next_node = PostNodeLLM.model_validate(next_node)
+
+                    queue.append(next_node)
+                    node_children.append((option_data.text, len(queue) - 1))
+            nodes.append((node_data, node_children))
+
+        return nodes
+
+    @classmethod
+    def _reserve_node_ids(cls, db: Session, count: int) -> list[int]:
+        """Reserve `count` primary keys for new post nodes in one statement."""
+        if db.get_bind().dialect.name == "postgresql":
+            return list(db.scalars(text(
+                "SELECT nextval(pg_get_serial_sequence('post_nodes', 'id')) FROM generate_series(1, :count)"
+            ), {"count": count}))
+
+        # SQLite serializes writers and the transaction already holds the write lock after flushing the post,
+        # so nobody else can insert nodes between reading the max id and inserting ours
+        max_id = db.scalar(select(func.max(PostNode.id))) or 0
+        return list(range(max_id + 1, max_id + 1 + count))
+
+    @classmethod
+    def _get_node_prompt(cls) -> str:
+        """Load the prompt for writing one node of an incrementally generated post"""
+        with open("prompts/post_node_generator.md", "r", encoding="utf-8") as f:
+            return f.read()
 
     @classmethod
     def _get_post_prompt(cls) -> str:
@@ -0,0 +1,101 @@
+"""Assembling post trees from their node rows, and the denormalized blob kept on the post row.
+
+Nodes are stored one row each, with their child links in the JSON `options` column, so serving a complete post used
+to mean loading every node row and validating each one into a response model. When `STORE_POST_TREE_BLOBS` is on,
+the worker also stores the finished `CompletePostResponse` as zlib-compressed JSON in `posts.complete_tree`, and a
+full-post read becomes a single primary-key lookup that returns the JSON as is.
+
+The node rows stay the source of truth and keep serving `GET /posts/nodes/{id}`. Updating or deleting a node
+through the ORM clears the blob of its post, which is then served from the rows again. Posts stored before the blob
+existed are given one by `backfill_post_tree_blobs`. Posts generated incrementally get their blob when their last
+pending node is written (see post_expansion.py), not before.
+"""
+import zlib
+from typing import Iterable
+
+from sqlalchemy import event, exists, select, update
+from sqlalchemy.orm import Session
+
+from backend.models.post import Post, PostNode
+from backend.schemas.post import CompletePostNodeResponse, CompletePostResponse, PostOptionSchema
+
+
+def build_node_response(node: PostNode) -> CompletePostNodeResponse:
+    """Build the response for a single node, parsing its options from JSON"""
+    options = []
+    if node.options:
+        for option in node.options:
+            options.append(PostOptionSchema(
+                text=option["text"],
+                node_id=option["node_id"]
+            ))
+
+    return CompletePostNodeResponse(
+        id=node.id,
+        content=node.content,
+        is_root=node.is_root,
+        is_ending=node.is_ending,
+        options=options,
+        is_expanded=node.is_expanded is not False,
+        created_at=node.created_at
+    )
+
+
+def assemble_complete_post(post: Post, nodes: Iterable[PostNode]) -> CompletePostResponse:
+    """Build a complete post tree from the post and all of its nodes"""
+    nodes_dict = {}
+    root_node = None
+
+    for node in nodes:
+        node_data = build_node_response(node)
+        nodes_dict[node.id] = node_data
+
+        if node.is_root:
+            root_node = node_data
+
+    return CompletePostResponse(
+        id=post.id,
+        title=post.title,
+        session_id=post.session_id,
+        created_at=post.created_at,
+        root_node=root_node,
+        all_nodes=nodes_dict
+    )
+
+
+def encode_post_tree(complete_post: CompletePostResponse) -> bytes:
+    return zlib.compress(complete_post.model_dump_json().encode(), 6)
+
+
+def decode_post_tree(blob: bytes) -> bytes:
+    """Return the JSON of a stored `CompletePostResponse`."""
+    return zlib.decompress(blob)
+
+
+def backfill_post_tree_blobs(db: Session, batch_size: int = 100) -> int:
+    """Store the tree blob of every complete post that doesn't have one yet. Returns the number of posts updated.
+
+    Posts with pending nodes are skipped, their blob is stored once the last one is written.
+    """
+    pending = exists().where(PostNode.post_id == Post.id, PostNode.is_expanded.is_(False))
+    updated = 0
+    while True:
+        posts = db.scalars(
+            select(Post).where(Post.complete_tree.is_(None), ~pending).order_by(Post.id).limit(batch_size)
+        ).all()
+        if not posts:
+            return updated
+
+        nodes_by_post = {post.id: [] for post in posts}
+        for node in db.scalars(select(PostNode).where(PostNode.post_id.in_(nodes_by_post)).order_by(PostNode.id)):
+            nodes_by_post[node.post_id].append(node)
+        for post in posts:
+            post.complete_tree = encode_post_tree(assemble_complete_post(post, nodes_by_post[post.id]))
+        db.commit()
+        updated += len(posts)
+
+
+@event.listens_for(PostNode, "after_update")
+@event.listens_for(PostNode, "after_delete")
+def _clear_post_tree_blob(mapper, connection, node: PostNode):
+    connection.execute(update(Post).where(Post.id == node.post_id).values(complete_tree=None))
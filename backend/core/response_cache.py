@@ -0,0 +1,146 @@
+"""In-process cache of serialized post trees and nodes, served with ETags.
+
+A generated post never changes, yet every `GET /posts/{id}/complete` and `GET /posts/nodes/{id}` used to query the
+database and rebuild the pydantic response. `ResponseCache` keeps the serialized JSON body and its ETag per post and
+per node in an LRU bounded by total size (`RESPONSE_CACHE_MAX_BYTES`), and `cached_json_response` answers
+conditional requests with `304 Not Modified` without touching the database or the body.
+
+Entries are dropped by `invalidate_post` and `invalidate_node`, which run automatically when a `Post` or `PostNode`
+is updated or deleted through the ORM in this process. Responses that are still going to change, like a post whose
+nodes are being generated incrementally (see post_expansion.py), are wrapped in `Uncacheable` by their builder: they
+are served with their ETag but neither cached here nor by clients.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from backend.core.config import settings
+from backend.models.post import Post, PostNode
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class Uncacheable(NamedTuple):
+    """A response built for `cached_json_response` that must not be cached."""
+    value: BaseModel | bytes
+
+
+class ResponseCache:
+    """A thread-safe LRU of `(body, etag)` pairs, evicting the least recently used entries beyond `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, body: bytes) -> tuple[bytes, str]:
+        entry = (body, make_etag(body))
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return entry
+
+    def invalidate(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+def post_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def node_key(node_id: int) -> str:
+    return f"node:{node_id}"
+
+
+def invalidate_post(post_id: int):
+    response_cache.invalidate(post_key(post_id))
+
+
+def invalidate_node(node_id: int, post_id: int | None = None):
+    """Drop a cached node, and the cached tree of the post it belongs to."""
+    response_cache.invalidate(node_key(node_id))
+    if post_id is not None:
+        invalidate_post(post_id)
+
+
+@event.listens_for(Post, "after_update")
+@event.listens_for(Post, "after_delete")
+def _on_post_change(mapper, connection, post: Post):
+    invalidate_post(post.id)
+
+
+@event.listens_for(PostNode, "after_update")
+@event.listens_for(PostNode, "after_delete")
+def _on_node_change(mapper, connection, node: PostNode):
+    invalidate_node(node.id, node.post_id)
+
+
+async def cached_json_response(
+        request: Request,
+        key: str,
+        build: Callable[[], Awaitable[BaseModel | bytes | Uncacheable | None]],
+) -> Response | None:
+    """Serve `key` from the cache, building and caching it with `build` on a miss.
+
+    `build` returns the response model or its already serialized JSON, wrapped in `Uncacheable` if it may still
+    change. Returns None when `build` does, so the caller can answer with a 404.
+    """
+    cacheable = True
+    entry = response_cache.get(key)
+    if entry is None:
+        built = await build()
+        if built is None:
+            return None
+        if isinstance(built, Uncacheable):
+            cacheable, built = False, built.value
+        body = built if isinstance(built, bytes) else built.model_dump_json().encode()
+        entry = response_cache.set(key, body) if cacheable else (body, make_etag(body))
+
+    body, etag = entry
+    cache_control = f"public, max-age={settings.RESPONSE_CACHE_MAX_AGE_SECONDS}" if cacheable else "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,67 @@
+"""Coalescing post requests for the same topic.
+
+Users often submit the same topic, or a near-identical wording of it, within a short window, and each request used
+to queue its own multi-agent run. Every job now stores a normalized `topic_key` (see `normalize_topic`), and
+`POST /posts/create`:
+
+- joins a pending or processing job with the same key instead of queueing another one (single-flight). A partial
+  unique index on `post_jobs.topic_key` over in-flight jobs makes this hold across concurrent requests and API
+  processes.
+- with `POST_REUSE_MAX_AGE_SECONDS` set, answers with the post of a job for the same key that completed within that
+  window, as a new job that is already completed.
+
+Clients opt out per request with `force_new`.
+"""
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.config import settings
+from backend.models.job import INFLIGHT_STATUSES, PostJob
+from metrics import Counter
+
+# Words that only frame the request, not what the topic is about
+FILLER_WORDS = frozenset("a an the please write post".split())
+
+POST_DEDUP = Counter("post_create_dedup_total", "Post requests answered by an existing job or post, by outcome.")
+
+
+def normalize_topic(topic: str) -> str:
+    """Reduce a topic to its words, so that rewordings of the same request share a key.
+
+    Case, accents, punctuation and filler words are ignored, word order is kept, since "dog bites man" and "man bites
+    dog", or "why remote work fails" and "how remote work fails", are different posts:
+    "Please write a post: The Future of AI!" becomes "future of ai".
+    """
+    text = unicodedata.normalize("NFKD", topic.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = re.findall(r"\w+", text)
+    # A topic made only of filler words still deserves a key of its own
+    return " ".join(word for word in words if word not in FILLER_WORDS) or " ".join(words) or " ".join(text.split())
+
+
+async def find_inflight_job(db: AsyncSession, topic_key: str) -> PostJob | None:
+    return await db.scalar(
+        select(PostJob).where(PostJob.topic_key == topic_key, PostJob.status.in_(INFLIGHT_STATUSES))
+    )
+
+
+async def find_recent_post_job(db: AsyncSession, topic_key: str) -> PostJob | None:
+    """The latest job for `topic_key` that completed within `POST_REUSE_MAX_AGE_SECONDS`, if reuse is enabled."""
+    if settings.POST_REUSE_MAX_AGE_SECONDS <= 0:
+        return None
+    since = datetime.now(timezone.utc) - timedelta(seconds=settings.POST_REUSE_MAX_AGE_SECONDS)
+    return await db.scalar(
+        select(PostJob)
+        .where(
+            PostJob.topic_key == topic_key,
+            PostJob.status == "completed",
+            PostJob.post_id.is_not(None),
+            PostJob.completed_at >= since,
+        )
+        .order_by(PostJob.completed_at.desc())
+        .limit(1)
+    )
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, Float, String, Integer, DateTime, Index, JSON
 from sqlalchemy.sql import func
 
 from backend.db.database import Base
 
+# Jobs that are queued or running, at most one of them per topic_key
+INFLIGHT_STATUSES = ("pending", "processing")
+
 class PostJob(Base):
     __tablename__ = 'post_jobs'
 
@@ -10,8 +13,56 @@ class PostJob(Base):
     job_id = Column(String, unique=True, index=True)
     session_id = Column(String, index=True)
     topic = Column(String)
+    # normalize_topic(topic), see backend/core/topic_dedup.py
+    topic_key = Column(String, nullable=True)
     status = Column(String)
     post_id = Column(Integer, nullable=True)
     error = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    completed_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Tokens, cost and latencies of the last attempt, see backend/core/job_telemetry.py
+    telemetry = Column(JSON, nullable=True)
+
+    # Queue bookkeeping, see backend/core/job_queue.py
+    attempts = Column(Integer, default=0)
+    run_after = Column(DateTime(timezone=True), nullable=True)
+    locked_by = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_post_jobs_status_run_after", "status", "run_after"),
+        Index(
+            "ux_post_jobs_inflight_topic_key", "topic_key", unique=True,
+            sqlite_where=status.in_(INFLIGHT_STATUSES), postgresql_where=status.in_(INFLIGHT_STATUSES),
+        ),
+        Index("ix_post_jobs_topic_key_completed_at", "topic_key", "completed_at"),
+    )
+
+
+class PostJobEvent(Base):
+    """A progress event of a running job, written by the worker and streamed by `GET /jobs/{job_id}/events`."""
+    __tablename__ = 'post_job_events'
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_post_job_events_job_id_id", "job_id", "id"),
+    )
+
+
+class AgentUsageTotal(Base):
+    """A cumulative counter of agent usage across all jobs, exported by `GET /metrics`.
+
+    Workers add each job's telemetry to these rows, so the API process can serve metrics of runs it didn't execute.
+    """
+    __tablename__ = 'agent_usage_totals'
+
+    # Prometheus sample name and its rendered labels, e.g. agent_prompt_tokens_total and agent="Supervisor"
+    name = Column(String, primary_key=True)
+    labels = Column(String, primary_key=True, default="")
+    value = Column(Float, nullable=False, default=0.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Index, JSON, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from backend.db.database import Base
@@ -10,9 +10,20 @@ class Post(Base):
     title = Column(String, index=True)
     session_id = Column(String, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Compressed JSON of the whole CompletePostResponse, see backend/core/post_trees.py
+    complete_tree = Column(LargeBinary, nullable=True)
+    # Topic and research of a post generated incrementally, for writing its pending nodes later (see
+    # backend/core/post_expansion.py)
+    generation_context = Column(JSON, nullable=True)
 
     nodes = relationship("PostNode", back_populates="post")
 
+    # Keyset pagination of GET /posts/, with and without the session_id filter
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_session_id_created_at_id", "session_id", "created_at", "id"),
+    )
+
 class PostNode(Base):
     __tablename__ = 'post_nodes'
 
@@ -22,6 +33,16 @@ class PostNode(Base):
     is_root = Column(Boolean, default=False)
     is_ending = Column(Boolean, default=False)
     options = Column(JSON, default=list)  # Store options as JSON
+    # Incremental generation stores a node as pending (False, only its brief known) before writing it. Nodes
+    # written with their post are True, or NULL if they predate the column.
+    is_expanded = Column(Boolean, default=True)
+    parent_id = Column(Integer, ForeignKey('post_nodes.id'), nullable=True)
+    brief = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    post = relationship("Post", back_populates="nodes")
\ No newline at end of file
+    post = relationship("Post", back_populates="nodes")
+
+    # Loading the nodes of a page of posts in id order
+    __table_args__ = (
+        Index("ix_post_nodes_post_id_id", "post_id", "id"),
+    )
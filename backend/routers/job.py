@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import time
+from typing import Optional
 
-from backend.db.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.config import settings
+from backend.core.job_events import TERMINAL_EVENTS, fetch_events
+from backend.db.database import AsyncSessionLocal, get_async_db
 from backend.models.job import PostJob
 from backend.schemas.job import PostJobResponse
 
@@ -12,10 +21,92 @@ router = APIRouter(
 
 
 @router.get("/{job_id}", response_model=PostJobResponse)
-def get_job_status(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(PostJob).filter(PostJob.job_id == job_id).first()
+async def get_job_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.scalar(select(PostJob).where(PostJob.job_id == job_id))
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@router.get("/{job_id}/telemetry")
+async def get_job_telemetry(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Tokens, estimated cost and latencies of the job's last attempt, per agent and per tool, or null before it ran"""
+    job = await db.scalar(select(PostJob).where(PostJob.job_id == job_id))
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return job
\ No newline at end of file
+    return job.telemetry
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+        job_id: str,
+        request: Request,
+        after: int = 0,
+        last_event_id: Optional[str] = Header(None),
+):
+    """Stream the progress of a job as Server-Sent Events.
+
+    Events are node transitions, tool calls and token chunks of the running agents, followed by a final
+    `completed` or `failed` event. Reconnecting clients resume after the `Last-Event-ID` they received.
+    """
+    # Not a dependency, which would keep its session and connection for as long as the stream lasts
+    async with AsyncSessionLocal() as db:
+        exists = await db.scalar(select(PostJob.id).where(PostJob.job_id == job_id))
+    if not exists:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    after_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else after
+    return StreamingResponse(
+        _event_stream(job_id, after_id, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _poll(job_id: str, after_id: int) -> tuple[list[dict], PostJob | None]:
+    """Read the next batch of events, and the job itself once there are none left."""
+    # A short-lived session per poll, so a long stream doesn't hold a pooled connection while it waits
+    async with AsyncSessionLocal() as db:
+        events = [
+            {"id": event.id, "type": event.type, "data": event.data or {}}
+            for event in await fetch_events(db, job_id, after_id)
+        ]
+        job = None if events else await db.scalar(select(PostJob).where(PostJob.job_id == job_id))
+        return events, job
+
+
+def _format_event(event_type: str, data: dict, event_id: int | None = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_type}", f"data: {json.dumps(data, default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+async def _event_stream(job_id: str, after_id: int, request: Request):
+    # Events are read in bounded batches and each one is only read after the previous batch was sent, so a slow
+    # client slows down its own polling instead of piling up events in memory
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        events, job = await _poll(job_id, after_id)
+        for event in events:
+            after_id = event["id"]
+            yield _format_event(event["type"], event["data"], event["id"])
+            if event["type"] in TERMINAL_EVENTS:
+                return
+        if events:
+            last_sent = time.monotonic()
+            continue
+
+        if job is None or job.status in TERMINAL_EVENTS:
+            # The job finished before its final event was written, or its events were already pruned
+            status = job.status if job else "failed"
+            yield _format_event(status, {"post_id": job.post_id, "error": job.error} if job else {"error": "Job not found"})
+            return
+
+        if time.monotonic() - last_sent >= settings.JOB_EVENT_KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(settings.JOB_EVENT_POLL_SECONDS)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.job_telemetry import render_usage_metrics
+from backend.db.database import get_async_db
+from metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(db: AsyncSession = Depends(get_async_db)):
+    """Prometheus metrics: the API's own, and the agents' usage totals of every job run by the workers"""
+    return PlainTextResponse(
+        render_metrics() + await render_usage_metrics(db),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,15 +1,28 @@
+import base64
+import logging
 import uuid
-from typing import Optional, List
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Cookie, Response, BackgroundTasks
-from sqlalchemy.orm import Session
-
-from backend.db.database import get_db, SessionLocal
+from datetime import datetime, timezone
+from typing import Literal, Optional, List, Union
+from fastapi import APIRouter, Depends, HTTPException, Cookie, Query, Request, Response
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.post_trees import assemble_complete_post, build_node_response, decode_post_tree
+from backend.core.post_expansion import expand_node
+from backend.core.response_cache import Uncacheable, cached_json_response, node_key, post_key
+from backend.core.topic_dedup import POST_DEDUP, find_inflight_job, find_recent_post_job, normalize_topic
+from backend.db.database import get_async_db
 from backend.models.post import Post, PostNode
 from backend.models.job import PostJob
-from backend.schemas.post import (CompletePostResponse, CompletePostNodeResponse, CreatePostRequest, PostOptionSchema)
+from backend.schemas.post import (CompletePostResponse, CompletePostNodeResponse, CreatePostRequest,
+                                 PostSummaryResponse)
 from backend.schemas.job import PostJobResponse
 
+MAX_PAGE_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/posts",
     tags=["posts"],
@@ -20,143 +33,193 @@ def get_session_id(session_id: Optional[str] = Cookie(None)):
         session_id = str(uuid.uuid4())
     return session_id
 
-@router.get("/", response_model=List[CompletePostResponse])
-def list_posts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """List all posts with pagination"""
-    posts = db.query(Post).offset(skip).limit(limit).all()
-    return [build_complete_post_tree(db, post) for post in posts]
+@router.get("/", response_model=Union[List[CompletePostResponse], List[PostSummaryResponse]])
+async def list_posts(
+        response: Response,
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        session_id: Optional[str] = None,
+        fields: Literal["full", "summary"] = "full",
+        skip: int = Query(0, ge=0, deprecated=True),
+        db: AsyncSession = Depends(get_async_db),
+):
+    """List posts in creation order, one page at a time
+
+    Pass the `X-Next-Cursor` header of a page as `cursor` to get the next one; it is absent on the last page.
+    `fields=summary` returns only the post metadata, without loading any nodes. `skip` is kept for older clients,
+    it gets slower the further it goes.
+    """
+    columns = (Post.id, Post.title, Post.session_id, Post.created_at)
+    query = select(Post) if fields == "full" else select(*columns)
+    if session_id is not None:
+        query = query.where(Post.session_id == session_id)
+    if cursor is not None:
+        query = query.where(after_cursor(cursor))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.order_by(Post.created_at, Post.id).limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].id if fields == "summary" else rows[-1][0].id)
+
+    if fields == "summary":
+        return [PostSummaryResponse.model_validate(row, from_attributes=True) for row in rows]
+    return await build_complete_post_trees(db, [row[0] for row in rows])
+
+
+def encode_cursor(post_id: int) -> str:
+    return base64.urlsafe_b64encode(str(post_id).encode()).decode()
+
+
+def after_cursor(cursor: str):
+    """The condition for posts after the one a cursor points to in (created_at, id) order
+
+    The cursor only carries the post id; its created_at is read back in a subquery so it is compared exactly as
+    stored (SQLite keeps timestamps as text, and a bound datetime wouldn't compare equal to them).
+    """
+    try:
+        post_id = int(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    cursor_created_at = select(Post.created_at).where(Post.id == post_id).scalar_subquery()
+    return tuple_(Post.created_at, Post.id) > tuple_(cursor_created_at, post_id)
 
 
 @router.post("/create", response_model=PostJobResponse)
-def create_post(
+async def create_post(
         request: CreatePostRequest,
-        background_tasks: BackgroundTasks,
         response: Response,
         session_id: str = Depends(get_session_id),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     response.set_cookie(key="session_id", value=session_id, httponly=True)
 
-    job_id = str(uuid.uuid4())
-
+    topic_key = normalize_topic(request.topic)
+    if not request.force_new:
+        inflight = await find_inflight_job(db, topic_key)
+        if inflight is not None:
+            POST_DEDUP.inc(outcome="joined")
+            return inflight
+
+        recent = await find_recent_post_job(db, topic_key)
+        if recent is not None:
+            POST_DEDUP.inc(outcome="reused")
+            job = PostJob(
+                job_id=str(uuid.uuid4()),
+                session_id=session_id,
+                topic=request.topic,
+                topic_key=topic_key,
+                status="completed",
+                post_id=recent.post_id,
+                completed_at=datetime.now(timezone.utc),
+            )
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+            return job
+
+    # The job is picked up from the post_jobs queue by a worker process (python -m backend.worker)
     job = PostJob(
-        job_id=job_id,
+        job_id=str(uuid.uuid4()),
         session_id=session_id,
         topic=request.topic,
+        topic_key=topic_key,
         status="pending"
     )
-
     db.add(job)
-    db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A job for the same topic was queued since we looked, at most one of them can be in flight
+        await db.rollback()
+        inflight = None if request.force_new else await find_inflight_job(db, topic_key)
+        if inflight is not None:
+            POST_DEDUP.inc(outcome="joined")
+            return inflight
+        job = PostJob(job_id=str(uuid.uuid4()), session_id=session_id, topic=request.topic, status="pending")
+        db.add(job)
+        await db.commit()
+    await db.refresh(job)
 
-    background_tasks.add_task(
-        generate_post_task,
-        job_id=job_id,
-        topic=request.topic,
-        session_id=session_id,
-    )
     return job
 
-def generate_post_task(job_id: str, topic: str, session_id: str):
-    db = SessionLocal()
-
-    try:
-        job = db.query(PostJob).filter(PostJob.job_id == job_id).first()
-        if not job:
-            return
-        try:
-            job.status = "processing"
-            db.commit()
-
-            # Generate the post using the PostGenerator
-            from backend.core.post_generator import PostGenerator
-            post = PostGenerator.generate_post(db, session_id, topic)
-
-            job.post_id = post.id
-            job.status = "completed"
-            job.completed_at = datetime.now()
-            db.commit()
-        except Exception as e:
-            job.status = "failed"
-            job.completed_at = datetime.now()
-            job.error = str(e)
-            db.commit()
-    finally:
-        db.close()
-
 @router.get("/{post_id}/complete", response_model=CompletePostResponse)
-def get_complete_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+async def get_complete_post(post_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        post = await db.get(Post, post_id)
+        if post is None:
+            return None
+        if post.complete_tree is not None:
+            return decode_post_tree(post.complete_tree)
+        tree = await build_complete_post_tree(db, post)
+        if not all(node.is_expanded for node in tree.all_nodes.values()):
+            # Nodes are still being generated, see backend/core/post_expansion.py
+            return Uncacheable(tree)
+        return tree
+
+    # Generated posts never change once complete, so they are served from the response cache with an ETag
+    response = await cached_json_response(request, post_key(post_id), build)
+    if response is None:
         raise HTTPException(status_code=404, detail="Post not found")
-
-    complete_post = build_complete_post_tree(db, post)
-    return complete_post
+    return response
 
 
 @router.get("/nodes/{node_id}", response_model=CompletePostNodeResponse)
-def get_node(node_id: int, db: Session = Depends(get_db)):
-    node = db.query(PostNode).filter(PostNode.id == node_id).first()
-    if not node:
+async def get_node(node_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        node = await db.get(PostNode, node_id)
+        if node is not None and node.is_expanded is False:
+            # A pending node of an incrementally generated post is written on its first request. End the read
+            # first, the LLM call takes seconds.
+            await db.rollback()
+            try:
+                await expand_node(node_id)
+            except Exception:
+                logger.exception("Could not expand node %s", node_id)
+                raise HTTPException(status_code=503, detail="The node could not be generated, try again later")
+            node = await db.get(PostNode, node_id, populate_existing=True)
+        return build_node_response(node) if node else None
+
+    response = await cached_json_response(request, node_key(node_id), build)
+    if response is None:
         raise HTTPException(status_code=404, detail="Node not found")
+    return response
 
-    # Parse options from JSON
-    options = []
-    if node.options:
-        for option in node.options:
-            options.append(PostOptionSchema(
-                text=option["text"],
-                node_id=option["node_id"]
-            ))
-
-    return CompletePostNodeResponse(
-        id=node.id,
-        content=node.content,
-        is_root=node.is_root,
-        is_ending=node.is_ending,
-        options=options,
-        created_at=node.created_at
-    )
 
+async def build_complete_post_trees(db: AsyncSession, posts: List[Post]) -> List[CompletePostResponse]:
+    """Build the complete trees for a page of posts, loading the nodes of all posts in a single query
 
-def build_complete_post_tree(db: Session, post: Post) -> CompletePostResponse:
-    """Build a complete post tree with all nodes and their relationships"""
-    # Get all nodes for this post
-    nodes = db.query(PostNode).filter(PostNode.post_id == post.id).all()
-    
-    # Create a mapping of node_id to node data
-    nodes_dict = {}
-    root_node = None
-    
-    for node in nodes:
-        # Parse options from JSON
-        options = []
-        if node.options:
-            for option in node.options:
-                options.append(PostOptionSchema(
-                    text=option["text"],
-                    node_id=option["node_id"]
-                ))
-        
-        node_data = CompletePostNodeResponse(
-            id=node.id,
-            content=node.content,
-            is_root=node.is_root,
-            is_ending=node.is_ending,
-            options=options,
-            created_at=node.created_at
+    Posts that have a stored tree blob are decoded from it and their nodes are not loaded at all.
+    """
+    nodes_by_post = {post.id: [] for post in posts if post.complete_tree is None}
+    if nodes_by_post:
+        nodes = await db.scalars(
+            select(PostNode).where(PostNode.post_id.in_(nodes_by_post.keys())).order_by(PostNode.id)
         )
-        
-        nodes_dict[node.id] = node_data
-        
-        if node.is_root:
-            root_node = node_data
-    
-    return CompletePostResponse(
-        id=post.id,
-        title=post.title,
-        session_id=post.session_id,
-        created_at=post.created_at,
-        root_node=root_node,
-        all_nodes=nodes_dict
-    )
\ No newline at end of file
+        for node in nodes:
+            nodes_by_post[node.post_id].append(node)
+
+    return [
+        CompletePostResponse.model_validate_json(decode_post_tree(post.complete_tree))
+        if post.complete_tree is not None
+        else await build_complete_post_tree(db, post, nodes_by_post[post.id])
+        for post in posts
+    ]
+
+
+async def build_complete_post_tree(
+        db: AsyncSession,
+        post: Post,
+        nodes: Optional[List[PostNode]] = None,
+) -> CompletePostResponse:
+    """Build a complete post tree with all nodes and their relationships
+
+    Pass `nodes` when they have already been loaded (see build_complete_post_trees) to skip the node query.
+    """
+    # Get all nodes for this post
+    if nodes is None:
+        nodes = (await db.scalars(select(PostNode).where(PostNode.post_id == post.id))).all()
+
+    return assemble_complete_post(post, nodes)
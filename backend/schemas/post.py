@@ -11,6 +11,9 @@ class PostNodeBase(BaseModel):
     is_root: bool = False
     is_ending: bool = False
     options: List[PostOptionSchema] = []
+    # False for a node of an incrementally generated post that hasn't been written yet, it is written when
+    # fetched through GET /posts/nodes/{id}
+    is_expanded: bool = True
 
 class CompletePostNodeResponse(PostNodeBase):
     id: int
@@ -28,6 +31,13 @@ class PostBase(BaseModel):
 
 class CreatePostRequest(BaseModel):
     topic: str
+    # Always queue a new job, instead of joining or reusing one for the same topic
+    force_new: bool = False
+
+class PostSummaryResponse(PostBase):
+    """A post without its nodes, returned by `GET /posts/?fields=summary`"""
+    id: int
+    created_at: datetime
 
 class CompletePostResponse(PostBase):
     id: int
@@ -0,0 +1,225 @@
+"""Worker pool that runs post generation jobs from the `post_jobs` queue.
+
+Run it next to the API process, as many times as needed:
+
+    python -m backend.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import TYPE_CHECKING
+
+from sqlalchemy.orm import Session
+
+from backend.core import job_events, job_queue, job_telemetry
+from backend.core.config import settings
+from backend.db.database import SessionLocal, create_tables
+# Import all models to ensure they are registered with SQLAlchemy
+from backend.models.job import AgentUsageTotal, PostJob, PostJobEvent
+from backend.models.post import Post, PostNode
+
+if TYPE_CHECKING:
+    # Imports LangChain, which is only loaded once the agents are warmed up
+    from telemetry import RunTelemetry
+
+logger = logging.getLogger(__name__)
+
+
+def _claim(worker_id: str) -> int | None:
+    db = SessionLocal()
+    try:
+        job = job_queue.claim_next_job(db, worker_id)
+        return job.id if job else None
+    finally:
+        db.close()
+
+
+def _heartbeat(job_pk: int, worker_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        return job_queue.heartbeat(db, db.get(PostJob, job_pk), worker_id)
+    finally:
+        db.close()
+
+
+async def _keep_alive(job_pk: int, worker_id: str, run: asyncio.Task):
+    """Renew the lease on a job while `run` runs it.
+
+    Once the lease is lost or can't be renewed, another worker may claim the job, so `run` is cancelled.
+    """
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            renewed = await asyncio.to_thread(_heartbeat, job_pk, worker_id)
+        except Exception:
+            logger.exception("Could not renew the lease on job %s, cancelling it", job_pk)
+            run.cancel()
+            return
+        if not renewed:
+            logger.warning("Lost the lease on job %s, cancelling it", job_pk)
+            run.cancel()
+            return
+
+
+def _record_failure(db: Session, job: PostJob, worker_id: str, telemetry: "RunTelemetry", error: str) -> dict | None:
+    """Record a failed attempt, to be retried if any attempts are left.
+
+    Returns the event announcing it, or None if the lease was lost.
+    """
+    db.rollback()
+    job_telemetry.record_job_telemetry(db, job, telemetry, "error")
+    if not job_queue.fail_job(db, job, worker_id, error):
+        return None
+    db.refresh(job)
+    if job.status == "failed":
+        return {"type": "failed", "error": job.error}
+    return {"type": "retrying", "error": job.error, "run_after": job.run_after.isoformat()}
+
+
+def _record_success(db: Session, job: PostJob, worker_id: str, telemetry: "RunTelemetry", post_id: int) -> dict | None:
+    """Record the job's post. Returns the event announcing it, or None if the lease was lost."""
+    job_telemetry.record_job_telemetry(db, job, telemetry, "ok")
+    if not job_queue.complete_job(db, job, worker_id, post_id):
+        return None
+    return {"type": "completed", "post_id": post_id}
+
+
+def _load_job(db: Session, job_pk: int) -> PostJob:
+    job = db.get(PostJob, job_pk)
+    # End the read so the connection goes back to the pool while the agents run, otherwise every job in flight
+    # holds one for its whole run and more slots than the pool allows starve each other (and the event writes)
+    db.commit()
+    return job
+
+
+async def process_job(job_pk: int, worker_id: str):
+    """Generate the post for a claimed job and record the outcome, if the worker still holds the job's lease.
+
+    Every database call runs in a thread, a write waiting on SQLite's lock would otherwise stall every job of the
+    worker and their heartbeats.
+    """
+    from backend.core.post_generator import PostGenerator
+    from telemetry import RunTelemetry
+
+    # Nothing is reloaded after a commit, the objects are only read on the event loop
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        job = await asyncio.to_thread(_load_job, db, job_pk)
+        job_id, attempt = job.job_id, job.attempts
+        events = job_events.JobEventPublisher(job_id)
+        logger.info("Processing job %s (attempt %s)", job_id, attempt)
+        await events.publish({"type": "started", "attempt": attempt})
+        telemetry = RunTelemetry()
+        run = asyncio.create_task(PostGenerator.generate_post(
+            db, job.session_id, job.topic, on_event=events.publish, telemetry=telemetry,
+            # A thread per attempt: the checkpoints are shared by every worker, and a retry shouldn't resume the
+            # state the failed attempt left behind
+            run_id=f"{job_id}_{attempt}",
+        ))
+        keep_alive = asyncio.create_task(_keep_alive(job_pk, worker_id, run))
+        try:
+            await asyncio.wait([run])
+        finally:
+            # Also stops the run when the worker itself is cancelled
+            run.cancel()
+            keep_alive.cancel()
+
+        if run.cancelled():
+            error = "Cancelled, the lease on the job could not be renewed"
+            event = await asyncio.to_thread(_record_failure, db, job, worker_id, telemetry, error)
+        elif run.exception() is not None:
+            logger.error("Job %s failed", job_id, exc_info=run.exception())
+            error = str(run.exception())
+            event = await asyncio.to_thread(_record_failure, db, job, worker_id, telemetry, error)
+        else:
+            event = await asyncio.to_thread(_record_success, db, job, worker_id, telemetry, run.result().id)
+
+        if event is None:
+            logger.warning("Job %s is leased by another worker, dropping the outcome of this attempt", job_id)
+        else:
+            await events.publish(event)
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def _prune_events() -> int:
+    db = SessionLocal()
+    try:
+        return job_events.prune_events(db)
+    finally:
+        db.close()
+
+
+async def _prune_checkpoints():
+    """Periodically trim old agent checkpoints and job events and delete expired threads."""
+    from checkpointer import checkpointer
+
+    while True:
+        try:
+            deleted = await checkpointer.prune()
+            logger.info("Pruned checkpoints, deleted %s expired threads", deleted)
+            deleted = await asyncio.to_thread(_prune_events)
+            logger.info("Pruned %s events of finished jobs", deleted)
+        except Exception:
+            logger.exception("Checkpoint pruning failed")
+        await asyncio.sleep(settings.CHECKPOINT_PRUNE_INTERVAL_SECONDS)
+
+
+async def run_worker(concurrency: int = settings.WORKER_CONCURRENCY):
+    """Claim and run jobs until SIGINT/SIGTERM, with at most `concurrency` jobs in flight."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    slots = asyncio.Semaphore(concurrency)
+    running: set[asyncio.Task] = set()
+    stopping = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    # Build the agent graphs now rather than in the first job
+    from agents import warm_up
+    await asyncio.to_thread(warm_up, "post_generator")
+
+    logger.info("Worker %s started with concurrency %s", worker_id, concurrency)
+    pruning = asyncio.create_task(_prune_checkpoints())
+    while not stopping.is_set():
+        await slots.acquire()
+        if stopping.is_set():
+            # Stopped while waiting for a job to finish, don't start another one
+            slots.release()
+            break
+        job_pk = await asyncio.to_thread(_claim, worker_id)
+        if job_pk is None:
+            slots.release()
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=settings.WORKER_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(process_job(job_pk, worker_id))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _: slots.release())
+
+    # Let jobs in flight finish, anything interrupted harder is recovered once its lease expires
+    logger.info("Worker %s stopping, waiting for %s running jobs", worker_id, len(running))
+    await asyncio.gather(*running, return_exceptions=True)
+    pruning.cancel()
+
+    from checkpointer import checkpointer
+    await checkpointer.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run post generation jobs from the queue.")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    create_tables()
+    asyncio.run(run_worker(args.concurrency))
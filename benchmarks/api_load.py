@@ -0,0 +1,174 @@
+"""Load test the post and job read endpoints, async routers against a sync baseline.
+
+Seeds a throwaway SQLite database, serves the API with uvicorn in a child process and hits
+`GET /posts/{id}/complete`, `GET /posts/nodes/{id}` and `GET /jobs/{id}` from `--concurrency` concurrent clients.
+The baseline app serves the same endpoints the way the routers used to, with sync sessions in FastAPI's threadpool.
+
+Set `DATABASE_URL` to an empty Postgres database to measure the asyncpg path over a real network round-trip.
+
+Usage (from the repository root):
+    python -m benchmarks.api_load --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+import httpx
+import uvicorn
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from backend.db.database import create_tables, engine, get_db
+from backend.models.job import PostJob
+from backend.models.post import Post, PostNode
+from backend.routers import job, post
+from backend.schemas.job import PostJobResponse
+from backend.schemas.post import CompletePostNodeResponse, CompletePostResponse, PostOptionSchema
+from benchmarks.list_posts import seed
+
+PORT = 8766
+
+
+def sync_baseline_router() -> APIRouter:
+    """The read endpoints as they were before the async port."""
+    router = APIRouter()
+
+    def node_response(node: PostNode) -> CompletePostNodeResponse:
+        return CompletePostNodeResponse(
+            id=node.id,
+            content=node.content,
+            is_root=node.is_root,
+            is_ending=node.is_ending,
+            options=[PostOptionSchema(text=o["text"], node_id=o["node_id"]) for o in node.options or []],
+            created_at=node.created_at,
+        )
+
+    @router.get("/posts/{post_id}/complete", response_model=CompletePostResponse)
+    def get_complete_post(post_id: int, db: Session = Depends(get_db)):
+        post_db = db.query(Post).filter(Post.id == post_id).first()
+        if not post_db:
+            raise HTTPException(status_code=404, detail="Post not found")
+        nodes = {node.id: node_response(node) for node in db.query(PostNode).filter(PostNode.post_id == post_id)}
+        root = next((node for node in nodes.values() if node.is_root), None)
+        return CompletePostResponse(
+            id=post_db.id, title=post_db.title, session_id=post_db.session_id, created_at=post_db.created_at,
+            root_node=root, all_nodes=nodes,
+        )
+
+    @router.get("/posts/nodes/{node_id}", response_model=CompletePostNodeResponse)
+    def get_node(node_id: int, db: Session = Depends(get_db)):
+        node = db.query(PostNode).filter(PostNode.id == node_id).first()
+        if not node:
+            raise HTTPException(status_code=404, detail="Node not found")
+        return node_response(node)
+
+    @router.get("/jobs/{job_id}", response_model=PostJobResponse)
+    def get_job_status(job_id: str, db: Session = Depends(get_db)):
+        job_db = db.query(PostJob).filter(PostJob.job_id == job_id).first()
+        if not job_db:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job_db
+
+    return router
+
+
+def create_app(mode: str) -> FastAPI:
+    app = FastAPI()
+    if mode == "async":
+        app.include_router(post.router)
+        app.include_router(job.router)
+    else:
+        app.include_router(sync_baseline_router())
+    return app
+
+
+def seed_jobs(posts: int):
+    with engine.begin() as conn:
+        conn.execute(insert(PostJob), [
+            {"job_id": f"job-{i}", "session_id": "bench", "topic": "bench", "status": "completed", "post_id": i}
+            for i in range(1, posts + 1)
+        ])
+
+
+def run_server(mode: str):
+    # Connections opened while seeding belong to the parent process
+    engine.dispose()
+    uvicorn.run(create_app(mode), host="127.0.0.1", port=PORT, log_level="warning")
+
+
+def serve(mode: str) -> multiprocessing.Process:
+    """Start the API in its own process, so the load generator doesn't compete with it for the GIL."""
+    server = multiprocessing.get_context("fork").Process(target=run_server, args=(mode,), daemon=True)
+    server.start()
+    while True:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/docs")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+
+async def run_load(concurrency: int, duration: float, posts: int, nodes_per_post: int) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        async def client_loop(seed: int):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                post_id = rng.randint(1, posts)
+                path = rng.choice([
+                    f"/posts/{post_id}/complete",
+                    f"/posts/nodes/{(post_id - 1) * nodes_per_post + 1}",
+                    f"/jobs/job-{post_id}",
+                ])
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--nodes-per-post", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.posts, args.nodes_per_post)
+    seed_jobs(args.posts)
+
+    print(f"concurrency {args.concurrency}, {args.duration:g}s per mode")
+    print(f"{'mode':<6} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in args.modes:
+        server = serve(mode)
+        latencies = sorted(asyncio.run(run_load(args.concurrency, args.duration, args.posts, args.nodes_per_post)))
+        server.terminate()
+        server.join()
+
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"{mode:<6} {len(latencies):>9} {len(latencies) / args.duration:>8.0f} "
+            f"{statistics.median(latencies) * 1000:>8.1f} {p99 * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare process memory after many sessions with the in-memory and the SQLite checkpointer.
+
+Runs the supervisor graph with a `ScriptedChatModel` on `--sessions` distinct thread ids and reports the Python heap
+still allocated afterwards (tracemalloc), plus how long pruning takes on the SQLite store.
+
+Usage (from the repository root):
+    python -m benchmarks.checkpoint_memory --sessions 1000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["CHECKPOINT_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+
+from langchain_core.messages import HumanMessage
+
+import supervisor
+from benchmarks.fakes import ScriptedChatModel
+from checkpointer import PooledCheckpointer
+
+
+async def run_sessions(backend: str, sessions: int) -> PooledCheckpointer:
+    saver = PooledCheckpointer(backend)
+    supervisor.graph.checkpointer = saver
+
+    for session in range(sessions):
+        config = {"configurable": {"thread_id": f"session_{session}"}}
+        await supervisor.graph.ainvoke({"messages": [HumanMessage(content="Write a post about AI " * 50)]}, config=config)
+        await saver.mark_thread_finished(f"session_{session}")
+    return saver
+
+
+async def measure(backend: str, sessions: int):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    saver = await run_sessions(backend, sessions)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(f"{backend:<8} {sessions} sessions in {elapsed:6.2f}s, heap retained: {retained / 1024 / 1024:7.2f} MiB")
+
+    if backend != "memory":
+        start = time.perf_counter()
+        deleted = await saver.prune(keep_last=1, thread_ttl=0)
+        print(f"{backend:<8} pruned {deleted} finished threads in {time.perf_counter() - start:.2f}s")
+        await saver.aclose()
+
+
+async def main(sessions: int):
+    supervisor.llm_with_tools = ScriptedChatModel(latency=0)
+    # Warm up imports and lazily created objects so they don't count towards the first backend
+    await run_sessions("memory", 1)
+    await measure("memory", sessions)
+    await measure("sqlite", sessions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions))
@@ -0,0 +1,88 @@
+"""Measure how long the API process takes to import `main`, and fail if cold start regresses.
+
+Imports `main` in fresh interpreters with `python -X importtime`, reports the median wall time and the slowest
+top-level imports, and checks that none of the agent dependencies are imported by the API. Exits with status 1 when
+one of them is, or when the median exceeds `--max-seconds`, so it can run as a check in CI.
+
+Usage (from the repository root):
+    python -m benchmarks.cold_start --runs 5 --max-seconds 3
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Imported by the agents on first use, never by the API process itself (see agents.py)
+LAZY_MODULES = ("IPython", "langgraph", "langchain", "langchain_core", "langchain_openai", "openai", "tavily")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(",".join(sorted(name for name in {lazy} if name in sys.modules)))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def probe_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+    return env
+
+
+def import_main(env: dict) -> tuple[float, list[str], list[tuple[int, str]]]:
+    """Import main in a fresh interpreter. Returns the wall time, the lazy modules it imported and the cumulative
+    microseconds of each module imported directly by main."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(lazy=LAZY_MODULES)],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed, imported = result.stdout.splitlines()[-2:]
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # main itself is at indent 1, the modules it imports at 3
+        if match and len(match.group(3)) == 3:
+            top_level.append((int(match.group(2)), match.group(4)))
+    return float(elapsed), [name for name in imported.split(",") if name], sorted(top_level, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    env = probe_env()
+    # The first run also writes the bytecode caches, which later cold starts don't pay for
+    import_main(env)
+    runs = [import_main(env) for _ in range(args.runs)]
+    median = statistics.median(elapsed for elapsed, _, _ in runs)
+    _, imported, top_level = runs[-1]
+
+    print(f"import main: median {median * 1000:.0f} ms over {args.runs} runs")
+    print(f"slowest imports of main (cumulative):")
+    for microseconds, name in top_level[:args.top]:
+        print(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if imported:
+        failures.append(f"main imports agent dependencies: {', '.join(imported)}")
+    if median > args.max_seconds:
+        failures.append(f"median import time {median:.2f}s is over the {args.max_seconds:g}s budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
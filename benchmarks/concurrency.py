@@ -0,0 +1,52 @@
+"""Measure how N concurrent `graph.ainvoke` runs scale against a single run.
+
+The supervisor's model is replaced with a `ScriptedChatModel` so no API calls are made.
+If the nodes await the model, N concurrent runs finish in roughly the time of one.
+If anything blocks the event loop, the total grows linearly with N.
+
+Usage (from the repository root):
+    python -m benchmarks.concurrency --runs 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.messages import HumanMessage
+
+import supervisor
+from benchmarks.fakes import ScriptedChatModel
+
+
+async def run_once():
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    await supervisor.graph.ainvoke({"messages": [HumanMessage(content="Write a post about AI")]}, config=config)
+
+
+async def timed(runs: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(run_once() for _ in range(runs)))
+    return time.perf_counter() - start
+
+
+async def main(runs: int, latency: float):
+    supervisor.llm_with_tools = ScriptedChatModel(latency=latency)
+
+    single = await timed(1)
+    concurrent = await timed(runs)
+
+    print(f"model latency:        {latency:.3f}s")
+    print(f"1 run:                {single:.3f}s")
+    print(f"{runs} concurrent runs:".ljust(22) + f"{concurrent:.3f}s")
+    print(f"slowdown vs 1 run:    {concurrent / single:.2f}x (serialised would be ~{runs}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.latency))
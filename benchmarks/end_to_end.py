@@ -0,0 +1,273 @@
+"""Offline end-to-end benchmark of post generation at increasing concurrency.
+
+Every agent runs on a `ScriptedChatModel` (see fakes.py) and the researcher talks to the Tavily stub app in-process,
+so a full post costs no API calls and the same arguments always produce the same work. Targets:
+
+- `supervisor`: `supervisor.graph` runs, research fan-out and copywriter included.
+- `post_generator`: `post_generator_agent.graph` runs, the supervisor and its agents included.
+- `create`: the whole `POST /api/posts/create` flow. Clients create jobs through the API and poll them until they
+  finish, while `concurrency` in-process workers claim and run them from the queue, storing the posts. Compare
+  `--generation-mode agents` with the single-call `structured` mode, and `--tree-generation whole` with
+  `incremental` (see backend/core/post_generator.py and post_expansion.py).
+
+Each concurrency level runs `--jobs-per-client` jobs from each of `concurrency` clients and reports throughput, p50
+and p99 job latency, failed jobs, event-loop lag (how late a 10 ms timer fires, p99 and max) and the peak RSS.
+
+Usage (from the repository root):
+    python -m benchmarks.end_to_end --target create --concurrency 1 10 50 100 200 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+# Every job should do its own research rather than hit the cache of the first one
+os.environ.setdefault("RESEARCH_CACHE_BACKEND", "none")
+
+import httpx
+from langchain_core.messages import HumanMessage
+
+import copywriter
+import post_generator_agent
+import researcher
+import supervisor
+from backend.core.config import settings
+from backend.core.post_generator import PostGenerator
+from backend.db.database import create_tables
+from backend.worker import _claim, process_job
+from benchmarks.fakes import (ScriptedChatModel, copywriter_script, post_generator_script, post_response_script,
+                              research_script, supervisor_script)
+from benchmarks.tavily_stub import create_app as create_tavily_stub
+from research_cache import NullCache
+from tavily_client import TavilyClient, set_tavily_client
+
+TERMINAL_STATUSES = {"completed", "failed"}
+
+
+def install_fakes(args):
+    """Replace every model with a scripted one. Each agent gets its own seed, so latencies repeat run after run."""
+    def model(name: str, script, seed: int) -> ScriptedChatModel:
+        return ScriptedChatModel(
+            name=name, latency=args.llm_latency, latency_jitter=args.llm_jitter, seed=args.seed + seed, script=script
+        )
+
+    post_generator_agent.llm_with_tools = model("PostGenerator", post_generator_script, 1)
+    supervisor.llm_with_tools = model("Supervisor", supervisor_script(args.research_tasks), 2)
+    researcher.llm_with_tools = model("Researcher", research_script, 3)
+    copywriter.llm_with_tools = model("CopyWriter", copywriter_script, 4)
+    structured = model("Post Generator", post_response_script, 5)
+    PostGenerator._get_llm = classmethod(lambda cls: structured)
+
+
+def install_tavily_stub(args):
+    transport = httpx.ASGITransport(app=create_tavily_stub(args.tavily_latency))
+    set_tavily_client(TavilyClient(api_key="tvly-benchmark", base_url="http://tavily", cache=NullCache(),
+                                   max_concurrency=args.tavily_concurrency, transport=transport))
+
+
+def rss_bytes() -> int:
+    """The current resident set size, or the peak one where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoopMonitor:
+    """Samples event-loop lag and memory while a level runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: list[float] = []
+        self.peak_rss = rss_bytes()
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def run_graph(graph, topic: str):
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}, "recursion_limit": 50}
+    await graph.ainvoke({"messages": [HumanMessage(content=topic)]}, config=config)
+
+
+async def create_and_wait(client: httpx.AsyncClient, topic: str, session_id: str, poll: float):
+    response = await client.post("/api/posts/create", json={"topic": topic},
+                                 headers={"Cookie": f"session_id={session_id}"})
+    response.raise_for_status()
+    job = response.json()
+    while job["status"] not in TERMINAL_STATUSES:
+        await asyncio.sleep(poll)
+        job = (await client.get(f"/api/jobs/{job['job_id']}")).raise_for_status().json()
+    if job["status"] != "completed":
+        raise RuntimeError(job["error"])
+
+
+async def worker_loop(worker_id: str, stopping: asyncio.Event, poll: float):
+    """A worker of backend.worker with one job slot."""
+    while not stopping.is_set():
+        job_pk = await asyncio.to_thread(_claim, worker_id)
+        if job_pk is None:
+            await asyncio.sleep(poll)
+            continue
+        await process_job(job_pk, worker_id)
+
+
+class WorkerPool:
+    """`concurrency` workers on their own event loop in a background thread.
+
+    The worker makes blocking database calls on its loop. Sharing a loop with the API's async sessions would let one
+    of those calls wait on a SQLite lock held by a session that needs the same loop to commit, which can't happen
+    with the separate processes of a real deployment.
+    """
+
+    def __init__(self, args, concurrency: int):
+        self.args = args
+        self.concurrency = concurrency
+        self.monitor: LoopMonitor | None = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), daemon=True)
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        install_tavily_stub(self.args)
+        with LoopMonitor() as self.monitor:
+            workers = [worker_loop(f"bench-{self.concurrency}-{i}", self._stopping, self.args.poll)
+                       for i in range(self.concurrency)]
+            self._started.set()
+            await asyncio.gather(*workers)
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+
+
+async def run_level(args, concurrency: int, client: httpx.AsyncClient) -> dict:
+    latencies: list[float] = []
+    failures: list[str] = []
+
+    async def run_job(topic: str, session_id: str):
+        if args.target == "supervisor":
+            await run_graph(supervisor.graph, topic)
+        elif args.target == "post_generator":
+            await run_graph(post_generator_agent.graph, topic)
+        else:
+            await create_and_wait(client, topic, session_id, args.poll)
+
+    async def client_loop(index: int):
+        for job in range(args.jobs_per_client):
+            # Distinct topics and sessions, so jobs are neither coalesced nor share a checkpoint thread
+            name = f"{concurrency}-{index}-{job}"
+            start = time.perf_counter()
+            try:
+                await run_job(f"Benchmark topic {name}", f"bench-{name}")
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    with contextlib.ExitStack() as stack:
+        # The lag that matters is the one of the loop running the agents
+        monitor = stack.enter_context(LoopMonitor())
+        if args.target == "create":
+            monitor = stack.enter_context(WorkerPool(args, concurrency)).monitor
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "jobs": len(latencies) + len(failures),
+        "failed": len(failures),
+        "first_failure": failures[0] if failures else None,
+        "seconds": elapsed,
+        "jobs_per_second": len(latencies) / elapsed,
+        "p50_seconds": statistics.median(latencies) if latencies else 0.0,
+        "p99_seconds": percentile(latencies, 0.99),
+        "loop_lag_p99_ms": percentile(monitor.lags, 0.99) * 1000,
+        "loop_lag_max_ms": max(monitor.lags, default=0.0) * 1000,
+        "peak_rss_mib": monitor.peak_rss / 2 ** 20,
+    }
+
+
+async def main(args) -> list[dict]:
+    settings.POST_GENERATION_MODE = args.generation_mode
+    settings.POST_TREE_GENERATION = args.tree_generation
+    install_fakes(args)
+    install_tavily_stub(args)
+
+    import main as api
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench") as client:
+        print(f"target {args.target} ({args.generation_mode} generation, {args.tree_generation} tree), llm latency {args.llm_latency:g}s (+{args.llm_jitter:g}s jitter), "
+              f"tavily latency {args.tavily_latency:g}s, {args.jobs_per_client} jobs per client")
+        print(f"{'conc':>5} {'jobs':>6} {'failed':>6} {'jobs/s':>8} {'p50 s':>7} {'p99 s':>7} "
+              f"{'lag p99 ms':>10} {'lag max ms':>10} {'RSS MiB':>8}")
+        for concurrency in args.concurrency:
+            result = await run_level(args, concurrency, client)
+            results.append(result)
+            print(f"{result['concurrency']:>5} {result['jobs']:>6} {result['failed']:>6} "
+                  f"{result['jobs_per_second']:>8.2f} {result['p50_seconds']:>7.2f} {result['p99_seconds']:>7.2f} "
+                  f"{result['loop_lag_p99_ms']:>10.1f} {result['loop_lag_max_ms']:>10.1f} "
+                  f"{result['peak_rss_mib']:>8.0f}")
+            if result["first_failure"]:
+                print(f"      first failure: {result['first_failure'][:200]}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=["supervisor", "post_generator", "create"], default="create")
+    parser.add_argument("--generation-mode", choices=["agents", "structured"], default=settings.POST_GENERATION_MODE)
+    parser.add_argument("--tree-generation", choices=["whole", "incremental"], default=settings.POST_TREE_GENERATION)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--jobs-per-client", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--tavily-latency", type=float, default=0.2)
+    parser.add_argument("--tavily-concurrency", type=int, default=10)
+    parser.add_argument("--research-tasks", type=int, default=2)
+    parser.add_argument("--poll", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    create_tables()
+    results = asyncio.run(main(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
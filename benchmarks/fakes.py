@@ -0,0 +1,193 @@
+"""Offline stand-ins for the LLM so the graphs can be exercised without API calls.
+
+`ScriptedChatModel` answers with whatever its script returns for the conversation. The scripts below drive every agent
+through a complete post: the post generator starts the process, the supervisor fans research out and hands off to the
+copywriter, the researcher searches, extracts and reports, and the structured generator returns a small post tree.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, Callable
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+def final_answer(messages: list[BaseMessage]) -> AIMessage:
+    """Default script: answer immediately without calling any tools."""
+    return AIMessage(content="Done.")
+
+
+def tool_call(name: str, **args) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex}"}])
+
+
+def research_script(messages: list[BaseMessage]) -> AIMessage:
+    """Script for the researcher: search, extract the first hit, write a report on the task, then answer."""
+    last = messages[-1]
+    if not isinstance(last, ToolMessage):
+        return tool_call("search_web", query=str(last.content))
+    if last.name == "search_web":
+        return tool_call(
+            "extract_content_from_webpage", urls=["https://example.com/article"], query="benchmark findings"
+        )
+    if last.name == "extract_content_from_webpage":
+        task = str(current_task(messages)[0].content)[:200]
+        return tool_call("generate_research_report", topic=task, report=f"Benchmark findings on {task}.")
+    return AIMessage(content="Research complete.")
+
+
+def current_task(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """The messages since the last human message, i.e. the task an agent is working on right now."""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index:]
+    return messages
+
+
+def tool_results(messages: list[BaseMessage]) -> set[str]:
+    return {message.name for message in messages if isinstance(message, ToolMessage)}
+
+
+def supervisor_script(research_tasks: int = 2) -> Callable[[list[BaseMessage]], AIMessage]:
+    """Script for the supervisor: fan out `research_tasks` research tasks, hand off to the copywriter, then answer."""
+    def script(messages: list[BaseMessage]) -> AIMessage:
+        done = tool_results(current_task(messages))
+        if "handoff_research_tasks" not in done:
+            topic = str(current_task(messages)[0].content)[:200]
+            return tool_call("handoff_research_tasks", task_descriptions=[
+                f"Research angle {i + 1} of: {topic}" for i in range(research_tasks)
+            ])
+        if "handoff_to_subagent" not in done:
+            return tool_call("handoff_to_subagent", agent_name="copywriter", task_description="Write the post.")
+        return AIMessage(content="Research and writing complete.")
+    return script
+
+
+def copywriter_script(messages: list[BaseMessage]) -> AIMessage:
+    """Script for the copywriter: review the research, present path options, then answer."""
+    done = tool_results(current_task(messages))
+    if "review_research_reports" not in done:
+        return tool_call("review_research_reports")
+    if "present_path_options" not in done:
+        return tool_call("present_path_options", options=["Start with the data", "Start with a story"])
+    return AIMessage(content="The draft is ready with two paths to choose from.")
+
+
+def post_generator_script(messages: list[BaseMessage]) -> AIMessage:
+    """Script for the post generator agent: start the process, then answer once the supervisor is done."""
+    task = current_task(messages)
+    if "start_post_creation_process" not in tool_results(task):
+        return tool_call("start_post_creation_process", topic=str(task[0].content))
+    return AIMessage(content="The post is ready.")
+
+
+def post_response_script(messages: list[BaseMessage]) -> AIMessage:
+    """Script for the structured post generator: a post with a root and two endings, as PostLLMResponse JSON."""
+    topic = str(current_task(messages)[0].content)
+
+    def ending(path: str) -> dict:
+        return {"content": f"{path} ending. " + "lorem ipsum " * 40, "isEnding": True, "options": []}
+
+    return AIMessage(content=json.dumps({
+        "title": topic[:80],
+        "rootNode": {
+            "content": "lorem ipsum " * 60,
+            "isEnding": False,
+            "options": [
+                {"text": "Start with the data", "nextNode": ending("Data")},
+                {"text": "Start with a story", "nextNode": ending("Story")},
+            ],
+        },
+    }))
+
+
+def post_level_script(messages: list[BaseMessage]) -> AIMessage:
+    """Script for incremental generation: a node with two options, as PostLevelLLM JSON. The store turns nodes at
+    the maximum depth into endings."""
+    return AIMessage(content=json.dumps({
+        "content": "lorem ipsum " * 60,
+        "isEnding": False,
+        "options": [
+            {"text": "Show me the data", "brief": "The numbers behind the previous point."},
+            {"text": "Tell me a story", "brief": "A short case study of the previous point."},
+        ],
+    }))
+
+
+def post_root_script(messages: list[BaseMessage]) -> AIMessage:
+    """Script for incremental generation: the title and root node, as PostRootLLM JSON."""
+    level = json.loads(post_level_script(messages).content)
+    return AIMessage(content=json.dumps({"title": str(current_task(messages)[0].content)[:80], "rootNode": level}))
+
+
+# Scripts answering the structured output calls of PostGenerator, by schema
+STRUCTURED_SCRIPTS = {
+    "PostLLMResponse": post_response_script,
+    "PostRootLLM": post_root_script,
+    "PostLevelLLM": post_level_script,
+}
+
+
+def approximate_usage(messages: list[BaseMessage], response: AIMessage) -> dict:
+    """Token usage at roughly four characters per token, so telemetry has numbers to work with."""
+    input_tokens = sum(len(str(message.content)) for message in messages) // 4
+    output_tokens = (len(str(response.content)) + len(json.dumps(response.tool_calls))) // 4
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A chat model that waits `latency` seconds and then returns a scripted message.
+
+    The sync path blocks with `time.sleep` and the async path yields with `asyncio.sleep`,
+    which makes it easy to see whether a graph is awaiting the model or blocking the loop.
+    Scripts only see the conversation, not the system messages around it.
+
+    `latency_jitter` adds up to that many seconds to each call, drawn from a generator seeded with `seed`, so runs
+    are repeatable. Responses carry an approximate `usage_metadata`.
+    """
+    latency: float = 0.5
+    latency_jitter: float = 0.0
+    seed: int = 0
+    script: Callable[[list[BaseMessage]], AIMessage] = final_answer
+
+    _random: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any):
+        self._random = random.Random(self.seed)
+
+    def _latency(self) -> float:
+        return self.latency + (self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: list, **kwargs: Any):
+        # Tool schemas are irrelevant for scripted responses
+        return self
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        # The script for `schema` answers with its JSON, parse it like native structured output would
+        model = self.model_copy(update={"script": STRUCTURED_SCRIPTS.get(schema.__name__, self.script)})
+        return model | PydanticOutputParser(pydantic_object=schema)
+
+    def _respond(self, messages: list[BaseMessage]) -> ChatResult:
+        conversation = [message for message in messages if not isinstance(message, SystemMessage)]
+        response = self.script(conversation)
+        if response.usage_metadata is None:
+            response = response.model_copy(update={"usage_metadata": approximate_usage(messages, response)})
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._latency())
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._latency())
+        return self._respond(messages)
@@ -0,0 +1,114 @@
+"""Compare loading a page of posts one tree at a time against the batched loader, and deep pages of the list endpoint.
+
+Seeds a throwaway SQLite database with posts and nodes, then counts queries and times both loaders, and times
+`GET /posts/` for a page near the end of the table with `skip` against `cursor`, and with `fields=summary`.
+
+Usage (from the repository root):
+    python -m benchmarks.list_posts --posts 5000 --nodes-per-post 7 --page-size 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event, insert, select
+
+from backend.db.database import AsyncSessionLocal, async_engine, create_tables, engine
+from backend.models.job import PostJob  # registers post_jobs for create_tables
+from backend.models.post import Post, PostNode
+from backend.routers import post as post_router
+from backend.routers.post import build_complete_post_tree, build_complete_post_trees, encode_cursor
+
+
+def seed(posts: int, nodes_per_post: int):
+    with engine.begin() as conn:
+        conn.execute(insert(Post), [{"id": i, "title": f"Post {i}", "session_id": "bench"} for i in range(1, posts + 1)])
+        rows = []
+        node_id = 1
+        for post_id in range(1, posts + 1):
+            first = node_id
+            for n in range(nodes_per_post):
+                children = [first + c for c in (2 * n + 1, 2 * n + 2) if c < nodes_per_post]
+                rows.append({
+                    "id": node_id,
+                    "post_id": post_id,
+                    "content": "lorem ipsum " * 40,
+                    "is_root": n == 0,
+                    "is_ending": not children,
+                    "options": [{"text": f"Option {c}", "node_id": c} for c in children],
+                })
+                node_id += 1
+        conn.execute(insert(PostNode), rows)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+async def measure(label: str, load, page_size: int, repeats: int, counter: QueryCounter):
+    async with AsyncSessionLocal() as db:
+        start_queries = counter.count
+        start = time.perf_counter()
+        for _ in range(repeats):
+            db.expunge_all()
+            posts = (await db.scalars(select(Post).order_by(Post.id).limit(page_size))).all()
+            await load(db, posts)
+        elapsed = (time.perf_counter() - start) / repeats
+        queries = (counter.count - start_queries) / repeats
+        print(f"{label:<12} {elapsed * 1000:8.1f} ms/page  {queries:6.0f} queries/page")
+
+
+async def per_post(db, posts):
+    return [await build_complete_post_tree(db, post) for post in posts]
+
+
+async def measure_endpoint(label: str, client: httpx.AsyncClient, params: dict, repeats: int):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        response = await client.get("/posts/", params=params)
+        response.raise_for_status()
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"{label:<12} {elapsed * 1000:8.1f} ms/page  {len(response.content) / 1024:8.0f} KiB/page")
+
+
+async def main(args):
+    counter = QueryCounter()
+    print(f"{args.posts} posts x {args.nodes_per_post} nodes, page size {args.page_size}")
+    await measure("per post", per_post, args.page_size, args.repeats, counter)
+    await measure("batched", build_complete_post_trees, args.page_size, args.repeats, counter)
+
+    app = FastAPI()
+    app.include_router(post_router.router)
+    depth = args.posts - args.page_size
+    print(f"GET /posts/ after {depth} posts")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        page = {"limit": args.page_size}
+        await measure_endpoint("skip", client, {**page, "skip": depth}, args.repeats)
+        await measure_endpoint("cursor", client, {**page, "cursor": encode_cursor(depth)}, args.repeats)
+        await measure_endpoint("summary", client, {**page, "cursor": encode_cursor(depth), "fields": "summary"},
+                               args.repeats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--nodes-per-post", type=int, default=7)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.posts, args.nodes_per_post)
+    asyncio.run(main(args))
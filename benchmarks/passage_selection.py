@@ -0,0 +1,61 @@
+"""Measure how many tokens passage selection keeps out of the researcher's history.
+
+Builds synthetic articles of different lengths with a few paragraphs about the query buried in filler text, and
+reports the tokens of the full page against the tokens of the selected passages, whether every relevant paragraph
+was selected, and the time selection takes.
+
+Usage (from the repository root):
+    python -m benchmarks.passage_selection --sizes 5000 50000 200000
+"""
+import argparse
+import random
+import time
+
+from langchain_core.messages.utils import count_tokens_approximately
+
+from passage_selection import select_passages
+
+QUERY = "solid state battery energy density"
+RELEVANT = [
+    "Solid state battery cells reached an energy density of 450 Wh/kg in the latest pilot production run.",
+    "The energy density gains come from replacing the liquid electrolyte with a ceramic separator.",
+    "Analysts expect solid state battery packs in premium cars before the end of the decade.",
+]
+FILLER = (
+    "The company also reported quarterly revenue, hiring plans and updates to its office locations. "
+    "Executives discussed marketing campaigns, supply contracts and a new logo for the brand. "
+)
+
+
+def build_article(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    paragraphs = [FILLER * rng.randint(1, 3) for _ in range(max(1, size // (len(FILLER) * 2)))]
+    for sentence in RELEVANT:
+        paragraphs.insert(rng.randrange(len(paragraphs) + 1), sentence)
+    return "\n\n".join(paragraphs)
+
+
+def tokens(text: str) -> int:
+    return count_tokens_approximately([text])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000, 200000])
+    args = parser.parse_args()
+
+    print(f"{'chars':>8} {'full tokens':>12} {'selected':>9} {'kept':>6} {'recall':>7} {'ms':>7}")
+    for size in args.sizes:
+        article = build_article(size)
+        start = time.perf_counter()
+        passages = select_passages(article, QUERY)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        selected = "\n".join(passage["text"] for passage in passages)
+        recall = sum(sentence in selected for sentence in RELEVANT) / len(RELEVANT)
+        full, kept = tokens(article), tokens(selected)
+        print(f"{len(article):>8} {full:>12} {kept:>9} {kept / full:>6.1%} {recall:>7.0%} {elapsed:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
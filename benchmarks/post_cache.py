@@ -0,0 +1,87 @@
+"""Measure database load and latency of hot post reads with the response cache, ETags and tree blobs.
+
+Seeds a throwaway SQLite database and calls the post router in-process (no network) for a small set of hot posts,
+reporting queries and time per request for uncached reads assembled from node rows, uncached reads of the stored
+tree blobs, cached reads and conditional reads that are answered with 304.
+
+Usage (from the repository root):
+    python -m benchmarks.post_cache --hot-posts 20 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event
+
+from backend.core.post_trees import backfill_post_tree_blobs
+from backend.core.response_cache import response_cache
+from backend.db.database import SessionLocal, async_engine, create_tables
+from backend.routers import post
+from benchmarks.list_posts import seed
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+async def measure(label: str, client: httpx.AsyncClient, paths: list[str], requests: int, counter: QueryCounter,
+                  etags: dict | None = None, cached: bool = True):
+    start_queries = counter.count
+    statuses = set()
+    start = time.perf_counter()
+    for index in range(requests):
+        path = paths[index % len(paths)]
+        headers = {"If-None-Match": etags[path]} if etags else {}
+        if not cached:
+            response_cache.clear()
+        response = await client.get(path, headers=headers)
+        statuses.add(response.status_code)
+    elapsed = (time.perf_counter() - start) / requests
+    queries = (counter.count - start_queries) / requests
+    print(f"{label:<12} {elapsed * 1000:8.3f} ms/request  {queries:6.2f} queries/request  status {sorted(statuses)}")
+
+
+async def main(args):
+    app = FastAPI()
+    app.include_router(post.router)
+    counter = QueryCounter()
+    paths = [f"/posts/{post_id}/complete" for post_id in range(1, args.hot_posts + 1)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await measure("rows", client, paths, args.requests // 10, counter, cached=False)
+        db = SessionLocal()
+        backfill_post_tree_blobs(db)
+        db.close()
+        await measure("blobs", client, paths, args.requests // 10, counter, cached=False)
+        for path in paths:
+            await client.get(path)
+        await measure("cached", client, paths, args.requests, counter)
+        etags = {path: (await client.get(path)).headers["etag"] for path in paths}
+        await measure("304", client, paths, args.requests, counter, etags)
+    print(f"cache: {response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--nodes-per-post", type=int, default=15)
+    parser.add_argument("--hot-posts", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    create_tables()
+    seed(args.posts, args.nodes_per_post)
+    asyncio.run(main(args))
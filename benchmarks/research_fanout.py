@@ -0,0 +1,63 @@
+"""Compare sequential researcher handoffs with a single parallel fan-out in the supervisor graph.
+
+Both the supervisor and the researcher run on `ScriptedChatModel`s. In sequential mode the supervisor hands off one
+task per turn with `handoff_to_subagent`, in fan-out mode it hands off all tasks at once with `handoff_research_tasks`.
+
+Usage (from the repository root):
+    python -m benchmarks.research_fanout --tasks 4 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import researcher
+import supervisor
+from benchmarks.fakes import ScriptedChatModel, tool_call
+
+
+def report_script(messages):
+    """Researcher: write a report on the task straight away, then answer."""
+    if isinstance(messages[-1], ToolMessage):
+        return AIMessage(content="Research complete.")
+    return tool_call("generate_research_report", topic=str(messages[-1].content), report="Findings.")
+
+
+def supervisor_script(tasks: int, fan_out: bool):
+    def script(messages):
+        handoffs = sum(1 for message in messages if isinstance(message, ToolMessage))
+        if fan_out and not handoffs:
+            return tool_call("handoff_research_tasks", task_descriptions=[f"Task {i}" for i in range(tasks)])
+        if not fan_out and handoffs < tasks:
+            return tool_call("handoff_to_subagent", agent_name="researcher", task_description=f"Task {handoffs}")
+        return AIMessage(content="All research complete.")
+    return script
+
+
+async def run(tasks: int, fan_out: bool) -> tuple[float, int]:
+    supervisor.llm_with_tools = ScriptedChatModel(latency=0, script=supervisor_script(tasks, fan_out))
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    start = time.perf_counter()
+    result = await supervisor.graph.ainvoke({"messages": [HumanMessage(content="Research remote work")]}, config=config)
+    return time.perf_counter() - start, len(result["research_reports"])
+
+
+async def main(tasks: int, latency: float):
+    researcher.llm_with_tools = ScriptedChatModel(latency=latency, script=report_script)
+    for label, fan_out in (("sequential", False), ("fan-out", True)):
+        elapsed, reports = await run(tasks, fan_out)
+        print(f"{label:<11} {elapsed:6.2f}s  {reports} reports")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.latency))
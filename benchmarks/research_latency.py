@@ -0,0 +1,67 @@
+"""Measure research-phase latency for many concurrent researcher runs against the Tavily stub.
+
+The stub server runs in a background thread with its own event loop, and the researcher model is a
+`ScriptedChatModel` that searches, extracts one page and writes a report.
+
+Usage (from the repository root):
+    python -m benchmarks.research_latency --jobs 50 --tavily-latency 0.2 --llm-latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+PORT = 8765
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+os.environ["TAVILY_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+import uvicorn
+from langchain_core.messages import HumanMessage
+
+import researcher
+from benchmarks.fakes import ScriptedChatModel, research_script
+from benchmarks.tavily_stub import create_app
+
+
+def start_stub(latency: float) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(create_app(latency), host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_job(index: int) -> float:
+    start = time.perf_counter()
+    await researcher.graph.ainvoke({"messages": [HumanMessage(content=f"Research topic {index}")]})
+    return time.perf_counter() - start
+
+
+async def main(jobs: int, llm_latency: float):
+    researcher.llm_with_tools = ScriptedChatModel(latency=llm_latency, script=research_script)
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(run_job(i) for i in range(jobs))))
+    total = time.perf_counter() - start
+
+    print(f"jobs:        {jobs}")
+    print(f"wall time:   {total:.3f}s")
+    print(f"p50 latency: {statistics.median(latencies):.3f}s")
+    print(f"p99 latency: {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--tavily-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = start_stub(args.tavily_latency)
+    try:
+        asyncio.run(main(args.jobs, args.llm_latency))
+    finally:
+        server.should_exit = True
@@ -0,0 +1,61 @@
+"""Time storing generated post trees of different sizes.
+
+Builds balanced trees with the requested number of nodes, stores them through
+`PostGenerator._store_generated_post` in a throwaway SQLite database and reports time and statement count.
+
+Usage (from the repository root):
+    python -m benchmarks.store_post_tree --sizes 50 500 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+from sqlalchemy import event
+
+from backend.core.post_generator import PostGenerator
+from backend.db.database import SessionLocal, create_tables, engine
+from backend.models.job import PostJob  # registers post_jobs for create_tables
+from backend.models.post import PostNode
+
+
+def build_tree(size: int, branching: int = 3) -> dict:
+    """Build a post with `size` nodes, each inner node having up to `branching` options."""
+    nodes = [{"content": f"Node {i} " + "lorem ipsum " * 40, "isEnding": True, "options": []} for i in range(size)]
+    for index in range(1, size):
+        parent = nodes[(index - 1) // branching]
+        parent["isEnding"] = False
+        parent["options"].append({"text": f"Go to {index}", "nextNode": nodes[index]})
+    return {"title": f"Tree of {size}", "rootNode": nodes[0]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    args = parser.parse_args()
+
+    create_tables()
+    statements = 0
+
+    def count(*_args, **_kwargs):
+        global statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+
+    for size in args.sizes:
+        post_data = build_tree(size)
+        db = SessionLocal()
+        try:
+            statements = 0
+            start = time.perf_counter()
+            post = PostGenerator._store_generated_post(db, "bench", post_data)
+            elapsed = time.perf_counter() - start
+            stored = db.query(PostNode).filter(PostNode.post_id == post.id).count()
+        finally:
+            db.close()
+        print(f"{size:>6} nodes: {elapsed * 1000:8.1f} ms, {statements:4d} statements, {stored} nodes stored")
@@ -0,0 +1,61 @@
+"""A local stand-in for the Tavily API with configurable latency.
+
+Point the researcher at it with `TAVILY_BASE_URL=http://127.0.0.1:8765`.
+
+Usage (from the repository root):
+    python -m benchmarks.tavily_stub --port 8765 --latency 0.2
+"""
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+
+class SearchRequest(BaseModel):
+    query: str
+    max_results: int = 3
+    topic: str = "general"
+
+
+class ExtractRequest(BaseModel):
+    urls: list[str]
+
+
+def create_app(latency: float = 0.2, page_size: int = 5000) -> FastAPI:
+    app = FastAPI(title="Tavily stub")
+
+    @app.post("/search")
+    async def search(request: SearchRequest):
+        await asyncio.sleep(latency)
+        return {
+            "query": request.query,
+            "results": [
+                {
+                    "title": f"Result {i} for {request.query}",
+                    "url": f"https://example.com/{i}",
+                    "content": f"Preview {i} about {request.query}.",
+                }
+                for i in range(request.max_results)
+            ],
+        }
+
+    @app.post("/extract")
+    async def extract(request: ExtractRequest):
+        await asyncio.sleep(latency)
+        return {
+            "results": [{"url": url, "raw_content": "lorem ipsum " * (page_size // 12)} for url in request.urls],
+            "failed_results": [],
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency), host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,250 @@
+"""Durable checkpointer shared by the agent graphs.
+
+The graphs used to compile with `MemorySaver()`, which keeps every checkpoint of every thread in process memory
+forever and cannot be shared by worker processes. `PooledCheckpointer` stores checkpoints in a database instead:
+
+- `sqlite`: a local file (`CHECKPOINT_SQLITE_PATH`), through `AsyncSqliteSaver`.
+- `postgres`: the database in `DATABASE_URL`, through `AsyncPostgresSaver` over a psycopg connection pool.
+- `memory`: the old in-process `MemorySaver`, handy for tests and notebooks.
+
+The backend is chosen with `CHECKPOINTER_BACKEND` and defaults to postgres when `DATABASE_URL` points at Postgres
+and to sqlite otherwise. The graphs are compiled at import time but the underlying connections are bound to an
+event loop, so the real saver is opened lazily on first use in each loop.
+
+Every worker process reads and writes the same checkpoints, so a thread must belong to a single run: post
+generation uses one thread per job attempt (see `PostGenerator.generate_post`), never one per session.
+
+Storage is kept bounded by `prune`, which keeps only the last `CHECKPOINT_KEEP_LAST` checkpoints per thread and
+deletes threads that finished more than `CHECKPOINT_THREAD_TTL` seconds ago (see `mark_thread_finished`). A post
+generation run finishes its thread whether it succeeds, fails or is cancelled.
+"""
+import asyncio
+import os
+import re
+import time
+import weakref
+from typing import Any, AsyncIterator
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.base import BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import RunnableConfig
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND") or ("postgres" if DATABASE_URL.startswith("postgres") else "sqlite")
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.db")
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "10"))
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "5"))
+CHECKPOINT_THREAD_TTL = float(os.getenv("CHECKPOINT_THREAD_TTL", str(7 * 24 * 60 * 60)))
+
+SQLITE_PRUNE_SQL = [
+    """DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, ROW_NUMBER() OVER (
+                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+            ) AS position FROM checkpoints
+        ) WHERE position > ?
+    )""",
+    """DELETE FROM writes WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id
+        AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+    )""",
+]
+
+POSTGRES_PRUNE_SQL = [
+    """DELETE FROM checkpoints c USING (
+        SELECT thread_id, checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+        ) AS position FROM checkpoints
+    ) ranked
+    WHERE c.thread_id = ranked.thread_id AND c.checkpoint_ns = ranked.checkpoint_ns
+    AND c.checkpoint_id = ranked.checkpoint_id AND ranked.position > %s""",
+    """DELETE FROM checkpoint_writes w WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c WHERE c.thread_id = w.thread_id
+        AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id
+    )""",
+    # Channel values live in their own table, keyed by version, and may be shared by several checkpoints
+    """DELETE FROM checkpoint_blobs b WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+        AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+    )""",
+]
+
+THREADS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS checkpoint_finished_threads (
+    thread_id TEXT PRIMARY KEY,
+    finished_at DOUBLE PRECISION NOT NULL
+)"""
+
+
+class PooledCheckpointer(BaseCheckpointSaver):
+    """A checkpointer that opens one pooled database saver per event loop and delegates to it.
+
+    Args:
+        backend: `sqlite`, `postgres` or `memory`.
+    """
+
+    def __init__(self, backend: str = CHECKPOINTER_BACKEND):
+        super().__init__()
+        self.backend = backend
+        self._savers: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task] = weakref.WeakKeyDictionary()
+        self._memory = MemorySaver() if backend == "memory" else None
+
+    async def _saver(self) -> BaseCheckpointSaver:
+        if self._memory is not None:
+            return self._memory
+
+        loop = asyncio.get_running_loop()
+        # Store the opening task rather than the saver, so concurrent first calls share a single connection
+        opening = self._savers.get(loop)
+        if opening is None:
+            opening = loop.create_task(self._open())
+            self._savers[loop] = opening
+        return await opening
+
+    async def _open(self) -> BaseCheckpointSaver:
+        if self.backend == "postgres":
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import AsyncConnectionPool
+
+            pool = AsyncConnectionPool(
+                # SQLAlchemy urls may name a driver (postgresql+psycopg2://), psycopg only accepts the plain scheme
+                re.sub(r"^postgres(ql)?\+\w+://", "postgresql://", DATABASE_URL),
+                min_size=1,
+                max_size=CHECKPOINT_POOL_SIZE,
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                open=False,
+            )
+            await pool.open()
+            saver = AsyncPostgresSaver(pool)
+            await saver.setup()
+            async with pool.connection() as conn:
+                await conn.execute(THREADS_TABLE_SQL)
+            return saver
+
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        conn = aiosqlite.connect(CHECKPOINT_SQLITE_PATH)
+        # aiosqlite runs the connection in its own thread, don't let a forgotten connection block interpreter exit
+        conn.daemon = True
+        await conn
+        saver = AsyncSqliteSaver(conn)
+        await saver.setup()
+        await conn.execute(THREADS_TABLE_SQL)
+        await conn.commit()
+        return saver
+
+    async def aclose(self):
+        """Close the connection or pool opened for the running event loop."""
+        opening = self._savers.pop(asyncio.get_running_loop(), None)
+        if opening is None:
+            return
+        saver = await opening
+        await saver.conn.close()
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await (await self._saver()).aget_tuple(config)
+
+    async def alist(
+            self,
+            config: RunnableConfig | None,
+            *,
+            filter: dict[str, Any] | None = None,
+            before: RunnableConfig | None = None,
+            limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for item in (await self._saver()).alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await (await self._saver()).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: list[tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        await (await self._saver()).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await (await self._saver()).adelete_thread(thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        # Called from inside a graph run, after aget_tuple has opened the saver for this loop
+        if self._memory is not None:
+            return self._memory.get_next_version(current, channel)
+        return self._savers[asyncio.get_running_loop()].result().get_next_version(current, channel)
+
+    async def mark_thread_finished(self, thread_id: str):
+        """Record that a thread is done, so `prune` deletes it once `CHECKPOINT_THREAD_TTL` has passed."""
+        if self._memory is not None:
+            return
+        saver = await self._saver()
+        if self.backend == "postgres":
+            async with saver.conn.connection() as conn:
+                await conn.execute(
+                    "INSERT INTO checkpoint_finished_threads (thread_id, finished_at) VALUES (%s, %s) "
+                    "ON CONFLICT (thread_id) DO UPDATE SET finished_at = excluded.finished_at",
+                    (thread_id, time.time()),
+                )
+        else:
+            async with saver.lock:
+                await saver.conn.execute(
+                    "INSERT INTO checkpoint_finished_threads (thread_id, finished_at) VALUES (?, ?) "
+                    "ON CONFLICT (thread_id) DO UPDATE SET finished_at = excluded.finished_at",
+                    (thread_id, time.time()),
+                )
+                await saver.conn.commit()
+
+    async def prune(self, keep_last: int = CHECKPOINT_KEEP_LAST, thread_ttl: float = CHECKPOINT_THREAD_TTL) -> int:
+        """Delete old checkpoints and expired finished threads. Returns the number of threads deleted."""
+        if self._memory is not None:
+            return 0
+        saver = await self._saver()
+        cutoff = time.time() - thread_ttl
+
+        if self.backend == "postgres":
+            async with saver.conn.connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT thread_id FROM checkpoint_finished_threads WHERE finished_at < %s", (cutoff,)
+                )
+                expired = [row["thread_id"] for row in await cursor.fetchall()]
+        else:
+            async with saver.conn.execute(
+                "SELECT thread_id FROM checkpoint_finished_threads WHERE finished_at < ?", (cutoff,)
+            ) as cursor:
+                expired = [row[0] for row in await cursor.fetchall()]
+
+        for thread_id in expired:
+            await saver.adelete_thread(thread_id)
+
+        if self.backend == "postgres":
+            async with saver.conn.connection() as conn:
+                await conn.execute("DELETE FROM checkpoint_finished_threads WHERE finished_at < %s", (cutoff,))
+                await conn.execute(POSTGRES_PRUNE_SQL[0], (keep_last,))
+                for statement in POSTGRES_PRUNE_SQL[1:]:
+                    await conn.execute(statement)
+        else:
+            async with saver.lock:
+                await saver.conn.execute("DELETE FROM checkpoint_finished_threads WHERE finished_at < ?", (cutoff,))
+                await saver.conn.execute(SQLITE_PRUNE_SQL[0], (keep_last,))
+                for statement in SQLITE_PRUNE_SQL[1:]:
+                    await saver.conn.execute(statement)
+                await saver.conn.commit()
+
+        return len(expired)
+
+
+# Shared by every graph that needs a checkpointer
+checkpointer = PooledCheckpointer()
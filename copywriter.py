@@ -1,21 +1,23 @@
-import operator
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 from typing import Annotated
-from langchain_core.messages import SystemMessage
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, add_messages, END
 from langgraph.prebuilt import ToolNode
-from datetime import datetime
 from langgraph.prebuilt import InjectedState
+from agent_prompts import load_system_prompt, build_prompt_messages
+from message_compaction import compact_history
+from research_reports import merge_research_reports
 
 load_dotenv()
 
-# Load the copywriter system prompt and content examples
-copywriter_prompt = open("prompts/copywriter.md", "r").read()
-linkedin_example = open("example_content/linkedin.md", "r").read()
-blog_example = open("example_content/blog.md", "r").read()
+# Load the copywriter system prompt with the content examples inlined once, so it is identical on every call
+copywriter_prompt = load_system_prompt(
+    "prompts/copywriter.md",
+    linkedin_example=open("example_content/linkedin.md", "r").read(),
+    blog_example=open("example_content/blog.md", "r").read(),
+)
 
 
 class CopyWriterState(BaseModel):
@@ -24,7 +26,7 @@ class CopyWriterState(BaseModel):
     The research_reports attribute is shared with the supervisor state. This allows the supervisor to access the research reports generated by the researcher and share them with the copywriter.
     """
     messages: Annotated[list, add_messages] = []
-    research_reports: Annotated[list, operator.add] = []
+    research_reports: Annotated[list, merge_research_reports] = []
 
 
 @tool
@@ -124,12 +126,8 @@ llm_with_tools = llm.bind_tools(tools)
 
 async def copywriter(state: CopyWriterState):
     """The main copywriter agent."""
-    system_prompt = SystemMessage(content=copywriter_prompt.format(
-        current_datetime=datetime.now(),
-        linkedin_example=linkedin_example,
-        blog_example=blog_example,
-    ))
-    response = llm_with_tools.invoke([system_prompt] + state.messages)
+    messages = compact_history("copywriter", state.messages)
+    response = await llm_with_tools.ainvoke(build_prompt_messages(copywriter_prompt, messages))
     return {"messages": [response]}
 
 
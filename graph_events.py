@@ -0,0 +1,78 @@
+"""Subgraph-aware progress events from a running agent graph.
+
+`stream_graph_events` runs a graph with `astream(subgraphs=True)` and turns its output into small JSON-friendly
+events: which node finished, which tool an agent called and the tokens it produced, each tagged with the agent it
+came from. The worker stores them for the `/jobs/{job_id}/events` endpoint, and main.py uses the same namespace to
+agent mapping for its console output.
+"""
+from typing import Any, Awaitable, Callable
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langgraph.graph.state import CompiledStateGraph
+
+# Node name prefixes of the subgraph calls, innermost match wins
+SUBGRAPH_AGENTS = {
+    "call_researcher": "researcher",
+    "call_copywriter": "copywriter",
+    "call_supervisor": "supervisor",
+}
+
+
+def agent_for_namespace(namespace: tuple[str, ...], root_agent: str = "supervisor") -> str:
+    """Return the agent that produced output in the given subgraph namespace."""
+    if not namespace:
+        return root_agent
+    for segment in reversed(namespace):
+        for prefix, agent in SUBGRAPH_AGENTS.items():
+            if segment.startswith(prefix):
+                return agent
+    # Fallback for unknown subgraphs
+    return "researcher"
+
+
+async def stream_graph_events(
+        graph: CompiledStateGraph,
+        input: Any,
+        on_event: Callable[[dict], Awaitable[None]],
+        root_agent: str = "supervisor",
+        **kwargs,
+) -> dict:
+    """Run `graph` to completion, awaiting `on_event` for every progress event, and return the final state.
+
+    Events have a `type` and the `agent` they came from:
+        - `node`: a node finished, with its `node` name.
+        - `tool_call`: the agent started a tool call, with the `tool` name.
+        - `token`: a chunk of the agent's response `text`.
+    """
+    final_state = {}
+    async for namespace, mode, chunk in graph.astream(
+            input=input,
+            stream_mode=["messages", "updates", "values"],
+            subgraphs=True,
+            **kwargs,
+    ):
+        if mode == "values":
+            if not namespace:
+                final_state = chunk
+            continue
+
+        agent = agent_for_namespace(namespace, root_agent)
+        if mode == "updates":
+            for node in chunk:
+                await on_event({"type": "node", "agent": agent, "node": node})
+            continue
+
+        message, _ = chunk
+        if isinstance(message, AIMessageChunk):
+            tool_names = [tool_chunk["name"] for tool_chunk in message.tool_call_chunks if tool_chunk.get("name")]
+        elif isinstance(message, AIMessage):
+            # Models that don't stream emit their whole message at once
+            tool_names = [tool_call["name"] for tool_call in message.tool_calls]
+        else:
+            continue
+        for tool_name in tool_names:
+            await on_event({"type": "tool_call", "agent": agent, "tool": tool_name})
+        if not message.tool_calls and not tool_names and isinstance(message.content, str) and message.content:
+            await on_event({"type": "token", "agent": agent, "text": message.content})
+
+    return final_state
@@ -0,0 +1,168 @@
+"""Record-and-replay cache of chat model responses.
+
+`install_llm_cache` plugs a `SQLiteLLMCache` into LangChain's global LLM cache, which every `ChatOpenAI` of the
+process consults before calling the API. Responses are keyed on a hash of the model and its parameters, the bound
+tools (both part of LangChain's `llm_string`) and the messages. The volatile date and time message appended by
+`agent_prompts.build_prompt_messages`, message ids and response metadata are left out of the key, so the same
+conversation hits the cache on any day and in any run.
+
+`LLM_CACHE_MODE` selects the behaviour:
+
+- `off` (default): no cache, every call goes to the API.
+- `record`: serve cached responses and store the responses of misses.
+- `replay`: serve cached responses and raise `LLMCacheMiss` on a miss, so a regression run never calls the API and
+  fails loudly when a prompt changed.
+
+Entries are stored as JSON in `LLM_CACHE_PATH`. Once the responses stored exceed `LLM_CACHE_MAX_BYTES`, the least
+recently used ones are evicted down to a tenth below it, so an insert doesn't scan the table for entries to evict.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any
+
+from dotenv import load_dotenv
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+
+from agent_prompts import VOLATILE_CONTEXT_PREFIX
+
+load_dotenv()
+
+LLM_CACHE_MODES = ("off", "record", "replay")
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# The responses are our own serialized AIMessages, the beta notice of their deserializer is noise on every hit
+warnings.filterwarnings("ignore", message="The function `loads` is in beta")
+
+# Message fields that differ from run to run without changing what the model is asked
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when no response was recorded for a call."""
+
+
+def _is_volatile_context(message: dict) -> bool:
+    kwargs = message.get("kwargs", {})
+    return (
+        message.get("id", [])[-1:] == ["SystemMessage"]
+        and isinstance(kwargs.get("content"), str)
+        and kwargs["content"].startswith(VOLATILE_CONTEXT_PREFIX)
+    )
+
+
+def make_key(prompt: str, llm_string: str) -> str:
+    """Hash a call: `prompt` is LangChain's serialized message list, `llm_string` the model, parameters and tools."""
+    messages = []
+    for message in json.loads(prompt):
+        if _is_volatile_context(message):
+            continue
+        kwargs = {
+            name: value for name, value in message.get("kwargs", {}).items() if name not in VOLATILE_MESSAGE_FIELDS
+        }
+        messages.append([message.get("id"), kwargs])
+    return hashlib.sha256(json.dumps([llm_string, messages], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """A file-backed LangChain LLM cache, evicting the least recently used responses beyond `max_bytes`."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES, strict: bool = False):
+        self.max_bytes = max_bytes
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+        # Bytes stored as far as this process knows, summed again before evicting
+        self._size = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        key = make_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            if self.strict:
+                raise LLMCacheMiss(f"No recorded response for LLM call {key[:12]} in replay mode")
+            return None
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        value = dumps(list(return_val))
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (make_key(prompt, llm_string), value, size, time.time()),
+            )
+            # Replacing a response counts too, the size is corrected before anything is evicted
+            self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        self._size = self._stored_bytes()
+        if self._size > self.max_bytes:
+            keep = self.max_bytes - self.max_bytes // 10
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total FROM llm_cache"
+                ") WHERE total > ?)",
+                (keep,),
+            )
+            self._size = self._stored_bytes()
+
+    def clear(self, **kwargs: Any):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._size = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+_cache: SQLiteLLMCache | None = None
+
+
+def install_llm_cache(mode: str = LLM_CACHE_MODE) -> SQLiteLLMCache | None:
+    """Plug the cache for `mode` into every chat model of the process, once. Returns it, or None when it's off."""
+    global _cache
+    if mode not in LLM_CACHE_MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(LLM_CACHE_MODES)}, not {mode!r}")
+    if mode == "off":
+        return None
+    if _cache is None:
+        _cache = SQLiteLLMCache(strict=mode == "replay")
+        set_llm_cache(_cache)
+    return _cache
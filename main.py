@@ -1,29 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.core.config import settings
-from backend.routers import post, job
+from backend.routers import post, job, metrics
 from backend.db.database import create_tables
-from langgraph.graph import StateGraph
-from langgraph.types import RunnableConfig
-from post_generator_agent import graph as post_generator_graph, PostGeneratorState
-from supervisor import graph as supervisor_graph, SupervisorState
-from langchain_core.messages import HumanMessage, AIMessageChunk
 from rich.console import Console
 from rich.panel import Panel
 
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
+    from supervisor import SupervisorState
+
+# The agent graphs, LangGraph and LangChain are imported by the CLI functions below when they run, so that serving
+# the API doesn't pay for them (the worker runs the agents, see agents.py)
+
 load_dotenv()
 
 # Import all models to ensure they are registered with SQLAlchemy
 from backend.models.job import PostJob
 from backend.models.post import Post, PostNode
-create_tables()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(create_tables)
+    yield
+
+
 app = FastAPI(
     title="Supervisor",
     description="api to generate posts",
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -32,10 +48,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor of GET /api/posts/
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(post.router, prefix=settings.API_PREFIX)
 app.include_router(job.router, prefix=settings.API_PREFIX)
+# Scraped by Prometheus at the conventional path, outside the API prefix
+app.include_router(metrics.router)
 
 def get_responsive_width(console: Console) -> int:
     """Get responsive width with margins for panels."""
@@ -102,6 +122,9 @@ async def stream_graph_responses(
         'supervisor': {'color': 'green', 'emoji': '🎯', 'name': 'Supervisor'},
     }
 
+    from langchain_core.messages import AIMessageChunk
+    from graph_events import agent_for_namespace
+
     # Track current AI message source to detect transitions
     current_ai_source = None
     current_content = ""
@@ -119,19 +142,7 @@ async def stream_graph_responses(
 
         if isinstance(message_chunk, AIMessageChunk):
             # Determine the source of this AI message directly from namespace
-            if namespace:
-                # This is from a subgraph - detect agent from namespace
-                namespace_str = str(namespace)
-                if "call_researcher" in namespace_str:
-                    ai_source = "researcher"
-                elif "call_copywriter" in namespace_str:
-                    ai_source = "copywriter"
-                else:
-                    # Fallback for unknown subgraphs
-                    ai_source = "researcher"
-            else:
-                # This is from the main graph (supervisor)
-                ai_source = "supervisor"
+            ai_source = agent_for_namespace(namespace)
 
             # Check if we're transitioning between different AI sources
             if current_ai_source != ai_source:
@@ -220,6 +231,13 @@ async def stream_graph_responses(
 
 async def main():
     """Main function to run the supervisor with subgraphs."""
+    from langchain_core.messages import HumanMessage
+    from langgraph.types import RunnableConfig
+    from agents import get_agent_module
+
+    post_generator_agent = get_agent_module("post_generator")
+    post_generator_graph = post_generator_agent.graph
+
     # Create console without fixed width - let it be responsive
     console = Console()
 
@@ -251,7 +269,7 @@ async def main():
                 break
 
             # Use PostGenerator as the main entry point
-            graph_input = PostGeneratorState(
+            graph_input = post_generator_agent.PostGeneratorState(
                 messages=[HumanMessage(content=user_input)]
             )
 
@@ -263,7 +281,6 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     import nest_asyncio
     import uvicorn
 
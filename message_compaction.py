@@ -0,0 +1,113 @@
+"""Token-budgeted compaction of the message history sent to each agent's LLM.
+
+Every tool call and every extracted web page stays in the agents' `messages` state and used to be re-sent on every
+turn. `compact_history` runs before each LLM call and, once the history is over the agent's token budget:
+
+1. Replaces the content of every tool output older than the most recent `keep_recent_turns` tool-call turns with a
+   short preview. The ToolMessage itself is kept, so every tool call still has its matching result.
+2. If that is not enough, drops the oldest turns, each AI tool-call message together with its tool results, while
+   always keeping the first message (the task).
+
+The state itself is left untouched, only the LLM input is compacted. Compacting every old tool output at once rather
+than just enough of them keeps the compacted history a stable prefix from one turn to the next, which preserves
+provider prompt caching (see agent_prompts.py).
+
+Budgets are set per agent with `<AGENT>_HISTORY_TOKEN_BUDGET` (e.g. `RESEARCHER_HISTORY_TOKEN_BUDGET`), tokens are
+estimated locally with `count_tokens_approximately`. Every call reports the tokens before and after compaction in a
+`history_compaction` custom callback event, which `telemetry.RunTelemetry` adds up per agent for the job.
+"""
+import logging
+import os
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import dispatch_custom_event
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_TOKEN_BUDGETS = {
+    "supervisor": 16000,
+    "researcher": 24000,
+    "copywriter": 24000,
+    "post_generator": 8000,
+}
+HISTORY_KEEP_RECENT_TURNS = int(os.getenv("HISTORY_KEEP_RECENT_TURNS", "1"))
+HISTORY_PREVIEW_CHARS = int(os.getenv("HISTORY_PREVIEW_CHARS", "400"))
+
+HISTORY_COMPACTION_EVENT = "history_compaction"
+
+
+def get_history_token_budget(agent: str) -> int:
+    return int(os.getenv(f"{agent.upper()}_HISTORY_TOKEN_BUDGET", DEFAULT_HISTORY_TOKEN_BUDGETS.get(agent, 16000)))
+
+
+def _count(messages: list[BaseMessage]) -> int:
+    return count_tokens_approximately(messages)
+
+
+def _turns(messages: list[BaseMessage]) -> list[list[int]]:
+    """Group message indexes into turns: an AI message with tool calls followed by its tool results."""
+    turns = []
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage) and turns and isinstance(messages[turns[-1][0]], AIMessage):
+            turns[-1].append(index)
+        else:
+            turns.append([index])
+    return turns
+
+
+def _preview(message: ToolMessage, tokens: int) -> ToolMessage:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return message.model_copy(update={
+        "content": f"{content[:HISTORY_PREVIEW_CHARS]}\n[... output compacted, about {tokens} tokens omitted]",
+    })
+
+
+def compact_messages(
+        messages: list[BaseMessage],
+        budget: int,
+        keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS,
+) -> list[BaseMessage]:
+    """Return `messages` compacted to fit within `budget` tokens, see the module docstring for the strategy."""
+    if _count(messages) <= budget:
+        return messages
+
+    turns = _turns(messages)
+    tool_turns = [turn for turn in turns if isinstance(messages[turn[0]], AIMessage) and len(turn) > 1]
+    protected = {index for turn in tool_turns[-keep_recent_turns:] for index in turn} if keep_recent_turns else set()
+
+    compacted = list(messages)
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage) and index not in protected:
+            tokens = _count([message])
+            if tokens > HISTORY_PREVIEW_CHARS // 2:
+                compacted[index] = _preview(message, tokens)
+
+    # Drop whole turns, oldest first, but never the task at the start or the protected recent turns
+    droppable = [turn for turn in turns[1:] if not protected.intersection(turn)]
+    dropped = set()
+    while droppable and _count([m for i, m in enumerate(compacted) if i not in dropped]) > budget:
+        dropped.update(droppable.pop(0))
+
+    return [message for index, message in enumerate(compacted) if index not in dropped]
+
+
+def compact_history(agent: str, messages: list[BaseMessage]) -> list[BaseMessage]:
+    """Compact an agent's history to its configured budget and report how many tokens were saved."""
+    before = _count(messages)
+    compacted = compact_messages(messages, get_history_token_budget(agent))
+    after = _count(compacted) if compacted is not messages else before
+
+    if compacted is not messages:
+        logger.debug("Compacted %s history from %d to %d tokens", agent, before, after)
+    try:
+        dispatch_custom_event(
+            HISTORY_COMPACTION_EVENT, {"agent": agent, "tokens_before": before, "tokens_after": after}
+        )
+    except RuntimeError:
+        # Called outside of a graph run, there is no callback to report to
+        pass
+    return compacted
@@ -0,0 +1,47 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Only what the API needs: counters with labels, registered in a module-level registry and rendered with
+`render_metrics()` in the Prometheus text format (version 0.0.4). Metrics of the agents, which run in the workers, are
+stored in the database instead (see backend/core/job_telemetry.py).
+"""
+import threading
+
+_registry = []
+
+
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for name, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """A monotonically increasing counter, one series per label combination."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{format_labels(labels)} {value}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,126 @@
+"""Relevance-based passage selection for extracted web pages.
+
+`extract_content_from_webpage` used to return whole page bodies, and a single long article could add tens of
+thousands of tokens to the researcher's history. Pages are now split into overlapping chunks, the chunks are scored
+against what the researcher is looking for with BM25 (computed locally over the page's own chunks), and only the
+top-k passages are returned, each with its character offsets in the page.
+
+The full text goes into a bounded in-process page store (`get_page_store`), which the `read_webpage` tool pages
+through when the researcher needs more than the selected passages.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from research_cache import MemoryCache, make_key, normalize_url
+
+load_dotenv()
+
+PASSAGE_CHUNK_CHARS = int(os.getenv("PASSAGE_CHUNK_CHARS", "1200"))
+PASSAGE_CHUNK_OVERLAP = int(os.getenv("PASSAGE_CHUNK_OVERLAP", "200"))
+PASSAGE_TOP_K = int(os.getenv("PASSAGE_TOP_K", "4"))
+PAGE_STORE_MAX_PAGES = int(os.getenv("PAGE_STORE_MAX_PAGES", "500"))
+PAGE_STORE_TTL = float(os.getenv("PAGE_STORE_TTL", str(60 * 60)))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what when where "
+    "which who why will with how".split()
+)
+
+_page_store: MemoryCache | None = None
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def split_into_chunks(
+        text: str,
+        chunk_chars: int = PASSAGE_CHUNK_CHARS,
+        overlap: int = PASSAGE_CHUNK_OVERLAP,
+) -> list[tuple[int, int]]:
+    """Split `text` into overlapping `(start, end)` spans, preferring to cut at paragraph or sentence breaks."""
+    spans = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            # Cut at the last break in the second half of the chunk, if there is one
+            window = text[start + chunk_chars // 2:end]
+            cut = max(window.rfind("\n\n"), window.rfind("\n"), window.rfind(". "))
+            if cut != -1:
+                end = start + chunk_chars // 2 + cut + 1
+        spans.append((start, end))
+        if end == len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return spans
+
+
+def bm25_scores(query: str, chunks: list[str]) -> list[float]:
+    """Score each chunk against `query` with BM25, using the chunks themselves as the corpus."""
+    query_terms = set(tokenize(query))
+    documents = [Counter(tokenize(chunk)) for chunk in chunks]
+    if not query_terms or not documents:
+        return [0.0] * len(chunks)
+
+    average_length = sum(sum(document.values()) for document in documents) / len(documents) or 1
+    document_frequency = {term: sum(1 for document in documents if term in document) for term in query_terms}
+
+    scores = []
+    for document in documents:
+        length = sum(document.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def select_passages(text: str, query: str, top_k: int = PASSAGE_TOP_K) -> list[dict]:
+    """Return the `top_k` chunks of `text` most relevant to `query`, in page order, with their offsets.
+
+    Without any matching chunk the start of the page is returned, which is usually the most informative part.
+    """
+    spans = split_into_chunks(text)
+    scores = bm25_scores(query, [text[start:end] for start, end in spans])
+    ranked = sorted(range(len(spans)), key=lambda index: scores[index], reverse=True)[:top_k]
+    if not any(scores[index] > 0 for index in ranked):
+        ranked = list(range(min(top_k, len(spans))))
+
+    return [
+        {
+            "start": spans[index][0],
+            "end": spans[index][1],
+            "score": round(scores[index], 3),
+            "text": text[spans[index][0]:spans[index][1]],
+        }
+        for index in sorted(ranked)
+    ]
+
+
+def get_page_store() -> MemoryCache:
+    """Return the process-wide store of full extracted page texts, keyed by url."""
+    global _page_store
+    if _page_store is None:
+        _page_store = MemoryCache(ttl=PAGE_STORE_TTL, max_entries=PAGE_STORE_MAX_PAGES)
+    return _page_store
+
+
+def store_page(url: str, text: str):
+    get_page_store().set(make_key("page", normalize_url(url)), text)
+
+
+def get_stored_page(url: str) -> str | None:
+    return get_page_store().get(make_key("page", normalize_url(url)))
@@ -1,21 +1,22 @@
-import operator
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 from typing import Annotated
-from langchain_core.messages import SystemMessage, ToolMessage, HumanMessage, AIMessage
+from langchain_core.messages import ToolMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, add_messages, END
 from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool, InjectedToolCallId
-from langgraph.checkpoint.memory import MemorySaver
-from datetime import datetime
 from supervisor import graph as supervisor_graph
 from langgraph.types import Command, RunnableConfig
+from agent_prompts import load_system_prompt, build_prompt_messages
+from message_compaction import compact_history
+from research_reports import merge_research_reports
+from checkpointer import checkpointer
 
 load_dotenv()
 
 # Load the post generator system prompt
-post_generator_prompt = open("prompts/post_generator_agent.md", "r").read()
+post_generator_prompt = load_system_prompt("prompts/post_generator_agent.md")
 
 
 class PostGeneratorState(BaseModel):
@@ -27,7 +28,7 @@ class PostGeneratorState(BaseModel):
     messages: Annotated[list, add_messages] = []
     topic: str | None = None
     post_id: int | None = None
-    research_reports: Annotated[list, operator.add] = []
+    research_reports: Annotated[list, merge_research_reports] = []
     current_options: list = []
     waiting_for_user_choice: bool = False
     chosen_path: str | None = None
@@ -179,11 +180,8 @@ llm_with_tools = llm.bind_tools(tools, parallel_tool_calls=False)
 
 async def post_generator(state: PostGeneratorState):
     """The main post generator agent."""
-    response = llm_with_tools.invoke([
-        SystemMessage(
-            content=post_generator_prompt.format(current_datetime=datetime.now())
-        )
-    ] + state.messages)
+    messages = compact_history("post_generator", state.messages)
+    response = await llm_with_tools.ainvoke(build_prompt_messages(post_generator_prompt, messages))
     return {"messages": [response]}
 
 
@@ -214,7 +212,7 @@ builder.add_conditional_edges(
 # Add edges for the tool-based routing
 builder.add_edge("call_supervisor", "post_generator")
 
-graph = builder.compile(checkpointer=MemorySaver())
+graph = builder.compile(checkpointer=checkpointer)
 
 # Visualize the graph
 # from IPython.display import Image
@@ -0,0 +1,240 @@
+"""Content-addressed cache for web search and page extraction results.
+
+Results are keyed on a hash of the normalized query or url, so near-identical searches and the same page
+extracted by different jobs are only paid for once. Two backends are available:
+
+- `MemoryCache`: a per-process LRU dictionary.
+- `SQLiteCache`: a file-backed cache that survives restarts and can be shared by processes on one machine.
+
+Both expire entries after a TTL, evict the least recently used entries beyond `max_entries` and count hits and
+misses. The backend is chosen with `RESEARCH_CACHE_BACKEND` (`memory`, `sqlite` or `none`). The hits and misses of
+each job are also reported by `tavily_client.py` and exported by `GET /metrics` (see backend/core/job_telemetry.py).
+
+Async callers use `aget_many` and `aset_many`, which run the SQLite backend's queries in a worker thread rather than
+on the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RESEARCH_CACHE_BACKEND = os.getenv("RESEARCH_CACHE_BACKEND", "memory")
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH", "research_cache.db")
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", str(24 * 60 * 60)))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "10000"))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation so trivially different queries match."""
+    return re.sub(r"\s+", " ", query.lower()).strip(" \t\n?!.,;:")
+
+
+def normalize_url(url: str) -> str:
+    """Canonicalize a url: lowercase scheme and host, drop fragments, tracking params and trailing slashes."""
+    parts = urlsplit(url.strip())
+    params = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+    )
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path.rstrip("/") or "/",
+        urlencode(params),
+        "",
+    ))
+
+
+def make_key(kind: str, *parts: Any) -> str:
+    """Build a content-addressed cache key from the request kind and its normalized parts."""
+    return hashlib.sha256(json.dumps([kind, *parts]).encode("utf-8")).hexdigest()
+
+
+class ResearchCache(ABC):
+    """Base class for cache backends, tracks hit and miss counters."""
+
+    # Whether the backend does I/O, which the async methods then run in a worker thread
+    blocking = False
+
+    def __init__(self, ttl: float = RESEARCH_CACHE_TTL, max_entries: int = RESEARCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: list[str]) -> list[Any | None]:
+        with self._lock:
+            values = [self._get(key) for key in keys]
+            hits = sum(value is not None for value in values)
+            self.hits += hits
+            self.misses += len(values) - hits
+            return values
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, Any]):
+        with self._lock:
+            for key, value in items.items():
+                self._set(key, value)
+
+    async def aget_many(self, keys: list[str]) -> list[Any | None]:
+        if self.blocking:
+            return await asyncio.to_thread(self.get_many, keys)
+        return self.get_many(keys)
+
+    async def aset_many(self, items: dict[str, Any]):
+        if self.blocking:
+            await asyncio.to_thread(self.set_many, items)
+        else:
+            self.set_many(items)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    @abstractmethod
+    def _get(self, key: str) -> Any | None:
+        """Return the value stored under `key`, or None if there is none or it expired."""
+
+    @abstractmethod
+    def _set(self, key: str, value: Any):
+        """Store `value` under `key`, evicting entries if the cache is full."""
+
+
+class NullCache(ResearchCache):
+    """A cache that never stores anything, used when caching is disabled."""
+
+    def _get(self, key: str) -> Any | None:
+        return None
+
+    def _set(self, key: str, value: Any):
+        pass
+
+
+class MemoryCache(ResearchCache):
+    """An in-process LRU cache with a TTL."""
+
+    def __init__(self, ttl: float = RESEARCH_CACHE_TTL, max_entries: int = RESEARCH_CACHE_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def _get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: Any):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SQLiteCache(ResearchCache):
+    """A file-backed LRU cache with a TTL, values are stored as JSON.
+
+    Entries are evicted once the table grows past `max_entries`, down to a tenth below it, so an insert doesn't scan
+    the table for entries to evict.
+    """
+    blocking = True
+
+    def __init__(
+            self,
+            path: str = RESEARCH_CACHE_PATH,
+            ttl: float = RESEARCH_CACHE_TTL,
+            max_entries: int = RESEARCH_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(ttl, max_entries)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS research_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_research_cache_accessed_at ON research_cache (accessed_at)")
+        # Entries stored as far as this process knows, counted again before evicting
+        self._entries = self._count()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM research_cache").fetchone()[0]
+
+    def _get(self, key: str) -> Any | None:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM research_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < now:
+            self._conn.execute("DELETE FROM research_cache WHERE key = ?", (key,))
+            self._entries -= 1
+            return None
+        self._conn.execute("UPDATE research_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def _set(self, key: str, value: Any):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO research_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl, now),
+        )
+        # Replacing an entry counts too, the count is corrected before anything is evicted
+        self._entries += 1
+        if self._entries > self.max_entries:
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM research_cache WHERE expires_at < ?", (now,))
+        self._entries = self._count()
+        if self._entries > self.max_entries:
+            keep = self.max_entries - self.max_entries // 10
+            self._conn.execute(
+                "DELETE FROM research_cache WHERE key IN ("
+                "SELECT key FROM research_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (keep,),
+            )
+            self._entries = keep
+
+
+_cache: ResearchCache | None = None
+
+
+def get_research_cache() -> ResearchCache:
+    """Return the process-wide cache configured by `RESEARCH_CACHE_BACKEND`, creating it on first use."""
+    global _cache
+    if _cache is None:
+        if RESEARCH_CACHE_BACKEND == "sqlite":
+            _cache = SQLiteCache()
+        elif RESEARCH_CACHE_BACKEND == "none":
+            _cache = NullCache()
+        else:
+            _cache = MemoryCache()
+    return _cache
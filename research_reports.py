@@ -0,0 +1,38 @@
+"""Research reports shared by the researcher, supervisor, copywriter and post generator graphs.
+
+Every graph passes its reports down to the subgraph it calls and receives them back in the subgraph's output. With
+an `operator.add` reducer this appended the full list again on every loop. `merge_research_reports` merges by report
+id instead, so a report that is handed back and forth is stored exactly once.
+"""
+import hashlib
+import json
+
+from pydantic import BaseModel, model_validator
+
+
+class ResearchReport(BaseModel):
+    # Derived from the content unless given, so a report has the same id (and the prompts that show it the same
+    # LLM cache key) in every run
+    id: str = ""
+    topic: str
+    report: str
+
+    @model_validator(mode="after")
+    def _content_id(self):
+        if not self.id:
+            self.id = hashlib.sha256(json.dumps([self.topic, self.report]).encode("utf-8")).hexdigest()[:32]
+        return self
+
+
+def merge_research_reports(left: list | None, right: list | None) -> list:
+    """Reducer for `research_reports` state attributes.
+
+    Reports are keyed by id. A report already in `left` is replaced in place by the one in `right` with the same id,
+    new reports are appended in order.
+    """
+    merged = {}
+    for report in (left or []) + (right or []):
+        if isinstance(report, dict):
+            report = ResearchReport.model_validate(report)
+        merged[report.id] = report
+    return list(merged.values())
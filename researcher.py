@@ -1,24 +1,29 @@
-import operator
+import asyncio
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 from typing import Annotated, List
-from langchain_core.messages import SystemMessage, ToolMessage
+from langchain_core.messages import ToolMessage
 from langgraph.graph import StateGraph, add_messages, END
 from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool, InjectedToolCallId
 from langgraph.checkpoint.memory import MemorySaver
-from langchain_tavily import TavilySearch, TavilyExtract
-from datetime import datetime
 from langgraph.types import Command
+from tavily_client import get_tavily_client
+from tool_execution import bounded_tool, get_tool_timeout
+from passage_selection import select_passages, store_page, get_stored_page
+from agent_prompts import load_system_prompt, build_prompt_messages
+from message_compaction import compact_history
+from research_reports import ResearchReport, merge_research_reports
 
 load_dotenv()
 
 # Load the researcher system prompt
-researcher_prompt = open("prompts/researcher.md", "r").read()
+researcher_prompt = load_system_prompt("prompts/researcher.md")
 
 
 @tool
+@bounded_tool
 async def search_web(
         query: str,
         num_results: int = 3
@@ -32,8 +37,7 @@ async def search_web(
     Returns:
         A dictionary of the search results.
     """
-    web_search = TavilySearch(max_results=min(num_results, 3), topic="general")
-    search_results = web_search.invoke(input={"query": query})
+    search_results = await get_tavily_client().search(query, max_results=min(num_results, 3), topic="general")
 
     processed_results = {
         "query": query,
@@ -51,24 +55,82 @@ async def search_web(
     return processed_results
 
 
+def _page_result(url: str, page: dict, query: str) -> dict:
+    """Keep the full page text in the page store and return only the passages most relevant to `query`."""
+    text = page.get("raw_content") or ""
+    store_page(url, text)
+    return {
+        "url": url,
+        "total_chars": len(text),
+        "passages": select_passages(text, query),
+    }
+
+
 @tool
-async def extract_content_from_webpage(urls: List[str]):
-    """Extract the content from a webpage.
+@bounded_tool
+async def extract_content_from_webpage(urls: List[str], query: str):
+    """Extract the content from a webpage and return the passages most relevant to the query.
 
     Args:
-        url: The url of the webpage to extract content from.
+        urls: The urls of the webpages to extract content from.
+        query: What you are looking for on the pages, used to select the most relevant passages.
 
     Returns:
-        A list of dictionaries containing the extracted content from each webpage.
+        A list with, for each webpage, its total length and the most relevant passages with their character offsets, or an error if the page could not be extracted. Use read_webpage to read other parts of a page.
     """
-    web_extract = TavilyExtract()
-    results = web_extract.invoke(input={"urls": urls})["results"]
+    client = get_tavily_client()
+    page_timeout = get_tool_timeout("extract_page")
+
+    # Each page is extracted on its own, so one slow or broken page doesn't cost the content of the others
+    responses = await asyncio.gather(
+        *(asyncio.wait_for(client.extract([url]), page_timeout) for url in urls),
+        return_exceptions=True,
+    )
+
+    results = []
+    for url, response in zip(urls, responses):
+        if isinstance(response, TimeoutError):
+            results.append({"url": url, "error": f"Timed out after {page_timeout:g} seconds"})
+        elif isinstance(response, Exception):
+            results.append({"url": url, "error": str(response) or type(response).__name__})
+        elif response["results"]:
+            results.append(_page_result(url, response["results"][0], query))
+        else:
+            failed = response["failed_results"][0] if response["failed_results"] else {}
+            results.append({"url": url, "error": failed.get("error", "No content could be extracted")})
     return results
 
 
-class ResearchReport(BaseModel):
-    topic: str
-    report: str
+@tool
+@bounded_tool
+async def read_webpage(url: str, offset: int = 0, length: int = 4000):
+    """Read part of a webpage that was extracted with extract_content_from_webpage.
+
+    Args:
+        url: The url of the webpage.
+        offset: The character offset to start reading from.
+        length: The number of characters to read, max is 8000.
+
+    Returns:
+        The requested part of the page and the offset to continue reading from, if there is more.
+    """
+    text = get_stored_page(url)
+    if text is None:
+        response = await get_tavily_client().extract([url])
+        if not response["results"]:
+            return {"url": url, "error": "The page could not be extracted"}
+        text = response["results"][0].get("raw_content") or ""
+        store_page(url, text)
+
+    end = min(offset + min(length, 8000), len(text))
+    return {
+        "url": url,
+        "start": offset,
+        "end": end,
+        "total_chars": len(text),
+        "text": text[offset:end],
+        "next_offset": end if end < len(text) else None,
+    }
 
 
 @tool
@@ -108,12 +170,13 @@ class ResearcherState(BaseModel):
     The research_reports attribute is shared with the supervisor state. This allows the supervisor to access the research reports generated by the researcher and share them with the copywriter.
     """
     messages: Annotated[list, add_messages] = []
-    research_reports: Annotated[list, operator.add] = []
+    research_reports: Annotated[list, merge_research_reports] = []
 
 
 tools = [
     search_web,
     extract_content_from_webpage,
+    read_webpage,
     generate_research_report,
 ]
 
@@ -127,10 +190,8 @@ llm_with_tools = llm.bind_tools(tools)
 
 async def researcher(state: ResearcherState):
     """The main researcher agent."""
-    response = llm_with_tools.invoke([
-                                         SystemMessage(
-                                             content=researcher_prompt.format(current_datetime=datetime.now()))
-                                     ] + state.messages)
+    messages = compact_history("researcher", state.messages)
+    response = await llm_with_tools.ainvoke(build_prompt_messages(researcher_prompt, messages))
     return {"messages": [response]}
 
 
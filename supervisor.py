@@ -1,22 +1,28 @@
-import operator
+import asyncio
+import os
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 from typing import Annotated, Literal
-from langchain_core.messages import SystemMessage, ToolMessage, HumanMessage, AIMessage
+from langchain_core.messages import ToolMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, add_messages, END
 from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool, InjectedToolCallId
-from langgraph.checkpoint.memory import MemorySaver
-from datetime import datetime
 from researcher import graph as research_agent
 from copywriter import graph as copywriter_agent
 from langgraph.types import Command, RunnableConfig
+from agent_prompts import load_system_prompt, build_prompt_messages
+from message_compaction import compact_history
+from research_reports import merge_research_reports
+from checkpointer import checkpointer
 
 load_dotenv()
 
 # Load the supervisor system prompt
-supervisor_prompt = open("prompts/supervisor.md", "r").read()
+supervisor_prompt = load_system_prompt("prompts/supervisor.md")
+
+# Maximum number of researcher subgraphs running at once for a single handoff_research_tasks call
+RESEARCH_FANOUT_CONCURRENCY = int(os.getenv("RESEARCH_FANOUT_CONCURRENCY", "4"))
 
 
 class SupervisorState(BaseModel):
@@ -25,8 +31,9 @@ class SupervisorState(BaseModel):
     The research_reports attribute is shared with the researcher agent. This allows us to share the research reports between the researcher and copywriter agents.
     """
     messages: Annotated[list, add_messages] = []
-    research_reports: Annotated[list, operator.add] = []
+    research_reports: Annotated[list, merge_research_reports] = []
     task_description: str | None = None
+    research_tasks: list[str] = []
 
 
 @tool
@@ -59,18 +66,48 @@ async def handoff_to_subagent(
     )
 
 
-async def call_researcher(state: SupervisorState, config: RunnableConfig):
-    """Call the researcher agent.
+@tool
+async def handoff_research_tasks(
+        task_descriptions: list[str],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+):
+    """Assign several independent research tasks at once. The researcher works on all of them in parallel.
 
-    The agent is invoked only with the task description generated by the supervisor, so the context window is not cluttered with the full conversation history of the supervisor.
+    Args:
+        task_descriptions: The descriptions of the research tasks, one atomic task per item.
     """
-    research_response = await research_agent.ainvoke(
+    update = {
+        "research_tasks": task_descriptions,
+        "messages": [ToolMessage(
+            name="handoff_research_tasks",
+            content=f"Successfully handed off {len(task_descriptions)} research tasks to the researcher.",
+            tool_call_id=tool_call_id,
+        )],
+    }
+
+    return Command(
+        goto="call_researchers",
+        update=update
+    )
+
+
+async def run_researcher(task_description: str, config: RunnableConfig) -> dict:
+    """Invoke the researcher agent with a single task description."""
+    return await research_agent.ainvoke(
         input={
-            "messages": [HumanMessage(content=state.task_description)],
+            "messages": [HumanMessage(content=task_description)],
         },
         config=config,
     )
 
+
+async def call_researcher(state: SupervisorState, config: RunnableConfig):
+    """Call the researcher agent.
+
+    The agent is invoked only with the task description generated by the supervisor, so the context window is not cluttered with the full conversation history of the supervisor.
+    """
+    research_response = await run_researcher(state.task_description, config)
+
     ai_message = AIMessage(name="researcher", content=research_response["messages"][-1].content)
 
     return {
@@ -79,6 +116,34 @@ async def call_researcher(state: SupervisorState, config: RunnableConfig):
     }
 
 
+async def call_researchers(state: SupervisorState, config: RunnableConfig):
+    """Call the researcher agent on several tasks concurrently.
+
+    Each task runs as its own researcher subgraph invocation, at most RESEARCH_FANOUT_CONCURRENCY at a time, so the research phase takes about as long as the slowest task instead of the sum of all of them. The reports of all tasks are merged into the shared research reports.
+    """
+    slots = asyncio.Semaphore(RESEARCH_FANOUT_CONCURRENCY)
+
+    async def run(task_description: str) -> dict:
+        async with slots:
+            return await run_researcher(task_description, config)
+
+    research_responses = await asyncio.gather(*(run(task) for task in state.research_tasks))
+
+    research_reports = []
+    messages = []
+    for task_description, research_response in zip(state.research_tasks, research_responses):
+        research_reports.extend(research_response["research_reports"])
+        messages.append(AIMessage(
+            name="researcher",
+            content=f"Task: {task_description}\n\n{research_response['messages'][-1].content}",
+        ))
+
+    return {
+        "research_reports": research_reports,
+        "messages": messages,
+    }
+
+
 async def call_copywriter(state: SupervisorState, config: RunnableConfig):
     """Call the copywriter agent.
 
@@ -103,16 +168,14 @@ llm = ChatOpenAI(
     reasoning_effort="low",
 )
 
-tools = [handoff_to_subagent]
+tools = [handoff_to_subagent, handoff_research_tasks]
 llm_with_tools = llm.bind_tools(tools, parallel_tool_calls=False)
 
 
 async def supervisor(state: SupervisorState):
     """The main supervisor agent."""
-    response = llm_with_tools.invoke([
-                                         SystemMessage(
-                                             content=supervisor_prompt.format(current_datetime=datetime.now()))
-                                     ] + state.messages)
+    messages = compact_history("supervisor", state.messages)
+    response = await llm_with_tools.ainvoke(build_prompt_messages(supervisor_prompt, messages))
     return {"messages": [response]}
 
 
@@ -132,6 +195,7 @@ builder.add_node(
 )
 builder.add_node("tools", ToolNode(tools))
 builder.add_node(call_researcher)
+builder.add_node(call_researchers)
 builder.add_node(call_copywriter)
 
 builder.set_entry_point("supervisor")
@@ -149,12 +213,13 @@ builder.add_conditional_edges(
 
 # Now every time we call a sub-agent we need to route back to the supervisor
 builder.add_edge("call_researcher", "supervisor")
+builder.add_edge("call_researchers", "supervisor")
 builder.add_edge("call_copywriter", "supervisor")
 
-graph = builder.compile(checkpointer=MemorySaver())
+graph = builder.compile(checkpointer=checkpointer)
 
 # Visualize the graph
-from IPython.display import Image
+# from IPython.display import Image
 
 # Image(graph.get_graph(xray=True).draw_mermaid_png())
 # print(graph.get_graph(xray=True).draw_mermaid())
@@ -0,0 +1,142 @@
+"""Shared async client for the Tavily search and extract APIs.
+
+The researcher tools used to build a new `TavilySearch`/`TavilyExtract` wrapper and call the blocking `.invoke` on
+every tool call. This module keeps one long-lived `httpx.AsyncClient` per event loop instead, so connections are
+reused, the number of in-flight requests is capped and every request has a timeout. Responses are stored in the
+research cache (see `research_cache.py`), so repeated searches and extractions cost no network time or API credits.
+Every cache lookup reports its hits and misses in a `research_cache` custom callback event, which
+`telemetry.RunTelemetry` adds up for the job.
+
+Set `TAVILY_BASE_URL` to point the researcher at a local stub server (see `benchmarks/tavily_stub.py`).
+"""
+import asyncio
+import os
+import weakref
+
+import httpx
+from dotenv import load_dotenv
+from langchain_core.callbacks import adispatch_custom_event
+
+from research_cache import ResearchCache, NullCache, get_research_cache, make_key, normalize_query, normalize_url
+
+load_dotenv()
+
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com")
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", "10"))
+TAVILY_TIMEOUT = float(os.getenv("TAVILY_TIMEOUT", "30"))
+
+RESEARCH_CACHE_EVENT = "research_cache"
+
+
+class TavilyClient:
+    """A pooled, concurrency-limited async client for Tavily.
+
+    Args:
+        api_key: The Tavily API key.
+        base_url: The Tavily API base url, override it to use a stub server.
+        max_concurrency: The maximum number of requests in flight at once.
+        timeout: The timeout in seconds for a single request.
+        cache: The cache consulted before every request.
+        transport: The httpx transport, e.g. an `httpx.ASGITransport` serving the stub app in-process.
+    """
+
+    def __init__(
+            self,
+            api_key: str,
+            base_url: str = TAVILY_BASE_URL,
+            max_concurrency: int = TAVILY_MAX_CONCURRENCY,
+            timeout: float = TAVILY_TIMEOUT,
+            cache: ResearchCache | None = None,
+            transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.cache = cache or NullCache()
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else None,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        # Requests queue here rather than in the connection pool, so waiting for a slot never counts as a pool timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        async with self._semaphore:
+            response = await self._http.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _cached(self, kind: str, keys: list[str]) -> list[dict | None]:
+        """Look `keys` up in the cache and report the hits and misses of the `kind` of request."""
+        values = await self.cache.aget_many(keys)
+        hits = sum(value is not None for value in values)
+        try:
+            await adispatch_custom_event(RESEARCH_CACHE_EVENT, {"kind": kind, "hits": hits, "misses": len(keys) - hits})
+        except RuntimeError:
+            # Called outside of a graph run, there is no callback to report to
+            pass
+        return values
+
+    async def search(self, query: str, max_results: int = 3, topic: str = "general") -> dict:
+        """Run a web search and return the raw Tavily response."""
+        key = make_key("search", normalize_query(query), max_results, topic)
+        [cached] = await self._cached("search", [key])
+        if cached is not None:
+            return cached
+
+        response = await self._post("/search", {
+            "query": query,
+            "max_results": max_results,
+            "topic": topic,
+        })
+        await self.cache.aset_many({key: response})
+        return response
+
+    async def extract(self, urls: list[str]) -> dict:
+        """Extract the content of the given urls and return the raw Tavily response.
+
+        Pages are cached one by one, so only the urls that have not been extracted before are requested.
+        """
+        keys = {url: make_key("extract", normalize_url(url)) for url in urls}
+        pages = dict(zip(keys, await self._cached("extract", list(keys.values()))))
+        missing = [url for url, page in pages.items() if page is None]
+
+        failed_results = []
+        if missing:
+            response = await self._post("/extract", {"urls": missing})
+            extracted = {make_key("extract", normalize_url(page["url"])): page for page in response.get("results", [])}
+            await self.cache.aset_many(extracted)
+            for url in missing:
+                if keys[url] in extracted:
+                    pages[url] = extracted[keys[url]]
+            failed_results = response.get("failed_results", [])
+
+        return {
+            "results": [page for page in pages.values() if page is not None],
+            "failed_results": failed_results,
+        }
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+# httpx connections are bound to the event loop that opened them, so each loop gets its own client
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TavilyClient] = weakref.WeakKeyDictionary()
+
+
+def get_tavily_client() -> TavilyClient:
+    """Return the shared client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY", ""), cache=get_research_cache())
+        _clients[loop] = client
+    return client
+
+
+def set_tavily_client(client: TavilyClient):
+    """Use `client` for the running event loop, e.g. a client of a stub server."""
+    _clients[asyncio.get_running_loop()] = client
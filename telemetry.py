@@ -0,0 +1,195 @@
+"""Per-run telemetry of the agents: tokens, estimated cost and latency of every LLM call, and tool latencies.
+
+`RunTelemetry` is a callback handler. Pass it in the `callbacks` of a run config and it is inherited by every LLM and
+tool call in the graph and its subgraphs. Each LLM call is attributed to the agent whose model made it, by the model's
+`name` (`Supervisor`, `Researcher`, `CopyWriter`, `PostGenerator`, `Post Generator`), and records:
+
+- prompt, completion and cached prompt tokens, and the estimated cost from `MODEL_PRICES`,
+- wall time, and the time to the first token when the call is streamed,
+- the graph node it ran in.
+
+Tool calls are recorded with their latency and outcome: `ok`, `error`, or `timeout` (see tool_execution.py). The
+tokens each agent's history compaction saved are added up from the events of message_compaction.py, and the research
+cache hits and misses of the searches and extractions from those of tavily_client.py.
+
+`summary()` returns all of it as JSON-friendly data, totals per agent and per tool first. The worker stores it on the
+job (see backend/core/job_telemetry.py).
+"""
+import time
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from message_compaction import HISTORY_COMPACTION_EVENT
+from tavily_client import RESEARCH_CACHE_EVENT
+from tool_execution import ToolTimeout
+
+# USD per million tokens: (prompt, cached prompt, completion)
+MODEL_PRICES = {
+    "gpt-5": (1.25, 0.125, 10.0),
+    "gpt-5-mini": (0.25, 0.025, 2.0),
+    "gpt-5-nano": (0.05, 0.005, 0.4),
+    "gpt-4.1": (2.0, 0.5, 8.0),
+    "gpt-4.1-mini": (0.4, 0.1, 1.6),
+    "gpt-4o": (2.5, 1.25, 10.0),
+    "gpt-4o-mini": (0.15, 0.075, 0.6),
+}
+
+# Individual calls kept in the summary, the totals always cover all of them
+MAX_RECORDED_CALLS = 200
+
+
+def model_price(model: str | None) -> tuple[float, float, float] | None:
+    """Prices of `model`, matching dated snapshots (gpt-5-mini-2025-08-07) to their base model."""
+    if not model:
+        return None
+    matches = [name for name in MODEL_PRICES if model == name or model.startswith(f"{name}-")]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str | None, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    price = model_price(model)
+    if price is None:
+        return 0.0
+    prompt, cached, completion = price
+    return ((prompt_tokens - cached_tokens) * prompt + cached_tokens * cached + completion_tokens * completion) / 1e6
+
+
+class RunTelemetry(BaseCallbackHandler):
+    """Callback handler that records every LLM and tool call of a run."""
+    run_inline = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.calls: list[dict] = []
+        self.tool_calls: list[dict] = []
+        self.history_compaction: dict[str, dict] = {}
+        self.research_cache: dict[str, dict] = {}
+        self._llm_runs: dict[UUID, dict] = {}
+        self._tool_runs: dict[UUID, tuple[str, float]] = {}
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, metadata: dict | None = None,
+                            invocation_params: dict | None = None, **kwargs: Any):
+        metadata = metadata or {}
+        invocation_params = invocation_params or {}
+        self._llm_runs[run_id] = {
+            "agent": (serialized or {}).get("name") or kwargs.get("name") or "unknown",
+            "node": metadata.get("langgraph_node"),
+            "model": metadata.get("ls_model_name") or invocation_params.get("model_name") or invocation_params.get("model"),
+            "start": time.perf_counter(),
+            "first_token": None,
+        }
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        run = self._llm_runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter()
+            if self.first_token_at is None:
+                self.first_token_at = run["first_token"]
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        prompt_tokens = completion_tokens = cached_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                cached_tokens += usage.get("input_token_details", {}).get("cache_read", 0)
+
+        end = time.perf_counter()
+        self.calls.append({
+            "agent": run["agent"],
+            "node": run["node"],
+            "model": run["model"],
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "cost_usd": estimate_cost(run["model"], prompt_tokens, cached_tokens, completion_tokens),
+            "seconds": end - run["start"],
+            "time_to_first_token": run["first_token"] - run["start"] if run["first_token"] is not None else None,
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._llm_runs.pop(run_id, None)
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any):
+        self._tool_runs[run_id] = ((serialized or {}).get("name") or kwargs.get("name") or "unknown", time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, "timeout" if isinstance(error, ToolTimeout) else "error")
+
+    def _finish_tool(self, run_id: UUID, outcome: str):
+        run = self._tool_runs.pop(run_id, None)
+        if run is not None:
+            tool, start = run
+            self.tool_calls.append({"tool": tool, "outcome": outcome, "seconds": time.perf_counter() - start})
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any):
+        if name == RESEARCH_CACHE_EVENT:
+            totals = self.research_cache.setdefault(data["kind"], {"hits": 0, "misses": 0})
+            totals["hits"] += data["hits"]
+            totals["misses"] += data["misses"]
+            return
+        if name != HISTORY_COMPACTION_EVENT:
+            return
+        totals = self.history_compaction.setdefault(data["agent"], {
+            "calls": 0, "compacted_calls": 0, "tokens_before": 0, "tokens_after": 0, "tokens_saved": 0,
+        })
+        totals["calls"] += 1
+        totals["compacted_calls"] += data["tokens_after"] < data["tokens_before"]
+        totals["tokens_before"] += data["tokens_before"]
+        totals["tokens_after"] += data["tokens_after"]
+        totals["tokens_saved"] += data["tokens_before"] - data["tokens_after"]
+
+    def summary(self) -> dict:
+        """Totals of the run so far, per agent, per tool, of each agent's history compaction and of the research cache
+        by kind of request, followed by the individual LLM calls."""
+        agents = {}
+        for call in self.calls:
+            totals = agents.setdefault(call["agent"], {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0,
+                "seconds": 0.0, "streamed_calls": 0, "time_to_first_token": 0.0,
+            })
+            totals["calls"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd", "seconds"):
+                totals[key] += call[key]
+            if call["time_to_first_token"] is not None:
+                totals["streamed_calls"] += 1
+                totals["time_to_first_token"] += call["time_to_first_token"]
+
+        for totals in agents.values():
+            # Mean over the streamed calls, the others have no first token to time
+            streamed = totals["streamed_calls"]
+            totals["time_to_first_token"] = totals["time_to_first_token"] / streamed if streamed else None
+
+        tools = {}
+        for call in self.tool_calls:
+            totals = tools.setdefault(call["tool"], {"calls": 0, "errors": 0, "seconds": 0.0})
+            totals["calls"] += 1
+            totals["errors"] += call["outcome"] != "ok"
+            totals["seconds"] += call["seconds"]
+
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "time_to_first_token": self.first_token_at - self.started if self.first_token_at is not None else None,
+            "prompt_tokens": sum(call["prompt_tokens"] for call in self.calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in self.calls),
+            "cached_tokens": sum(call["cached_tokens"] for call in self.calls),
+            "cost_usd": sum(call["cost_usd"] for call in self.calls),
+            "agents": agents,
+            "tools": tools,
+            "history_compaction": self.history_compaction,
+            "research_cache": self.research_cache,
+            "calls": self.calls[:MAX_RECORDED_CALLS],
+        }
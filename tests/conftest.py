@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# The agent modules build their models and clients at import time, run them offline
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-test")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+os.environ.setdefault("RESEARCH_CACHE_BACKEND", "none")
+os.environ.setdefault("LLM_CACHE_MODE", "off")
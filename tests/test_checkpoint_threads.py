@@ -0,0 +1,51 @@
+"""Every post generation run finishes its checkpoint thread, so `prune` deletes it once the TTL has passed."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import agents
+import checkpointer
+from backend.core.post_generator import PostGenerator
+from checkpointer import PooledCheckpointer
+from telemetry import RunTelemetry
+
+
+class FailingGraph:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+    async def ainvoke(self, agent_input, config):
+        raise self.error
+
+
+@pytest.fixture
+def sqlite_checkpointer(monkeypatch, tmp_path):
+    monkeypatch.setattr(checkpointer, "CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.db"))
+    saver = PooledCheckpointer("sqlite")
+    monkeypatch.setattr(checkpointer, "checkpointer", saver)
+    return saver
+
+
+def run_attempt(monkeypatch, saver: PooledCheckpointer, error: BaseException) -> int:
+    """Run an attempt whose graph raises `error`, then prune with a TTL that has passed. Returns the number of threads deleted."""
+    module = SimpleNamespace(graph=FailingGraph(error), PostGeneratorState=lambda messages: {"messages": messages})
+    monkeypatch.setattr(agents, "get_agent_module", lambda name: module)
+
+    async def attempt():
+        try:
+            with pytest.raises(type(error)):
+                await PostGenerator._run_agents("job_1", "Remote work", None, RunTelemetry())
+            return await saver.prune(thread_ttl=-1)
+        finally:
+            await saver.aclose()
+
+    return asyncio.run(attempt())
+
+
+def test_a_failed_attempt_finishes_its_thread(monkeypatch, sqlite_checkpointer):
+    assert run_attempt(monkeypatch, sqlite_checkpointer, RuntimeError("model unavailable")) == 1
+
+
+def test_a_cancelled_attempt_finishes_its_thread(monkeypatch, sqlite_checkpointer):
+    assert run_attempt(monkeypatch, sqlite_checkpointer, asyncio.CancelledError()) == 1
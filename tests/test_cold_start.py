@@ -0,0 +1,15 @@
+"""The API process starts without importing the agents. `python -m benchmarks.cold_start` reports the timings."""
+from benchmarks.cold_start import import_main, probe_env
+
+# The budget `python -m benchmarks.cold_start` checks by default
+MAX_SECONDS = 3.0
+
+
+def test_main_imports_none_of_the_agent_dependencies_and_stays_under_budget():
+    env = probe_env()
+    # The first run also writes the bytecode caches, which later cold starts don't pay for
+    import_main(env)
+    elapsed, imported, _ = import_main(env)
+
+    assert imported == []
+    assert elapsed < MAX_SECONDS
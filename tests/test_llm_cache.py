@@ -0,0 +1,73 @@
+"""Recording LLM responses and replaying them, and the size-bounded eviction of the recorded responses."""
+from datetime import datetime
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from agent_prompts import VOLATILE_CONTEXT_PREFIX
+from benchmarks.fakes import ScriptedChatModel
+from llm_cache import LLMCacheMiss, SQLiteLLMCache
+
+
+def counting_model(cache: SQLiteLLMCache) -> tuple[ScriptedChatModel, list[int]]:
+    """A model answering with the question it was asked, and the questions that reached it."""
+    calls = []
+
+    def script(messages: list[BaseMessage]) -> AIMessage:
+        calls.append(messages[-1].content)
+        return AIMessage(content=f"About {messages[-1].content}")
+
+    return ScriptedChatModel(latency=0, script=script, cache=cache), calls
+
+
+def prompt(question: str, now: datetime) -> list[BaseMessage]:
+    return [
+        SystemMessage(content="You write posts."),
+        HumanMessage(content=question),
+        SystemMessage(content=f"{VOLATILE_CONTEXT_PREFIX}{now}."),
+    ]
+
+
+def test_replay_serves_recorded_responses_on_any_day(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    model, calls = counting_model(SQLiteLLMCache(path))
+    recorded = model.invoke(prompt("Remote work?", datetime(2025, 1, 1, 9)))
+
+    replay_model, replay_calls = counting_model(SQLiteLLMCache(path, strict=True))
+    replay_model.script = model.script
+    replayed = replay_model.invoke(prompt("Remote work?", datetime(2026, 6, 30, 18)))
+
+    assert replayed.content == recorded.content == "About Remote work?"
+    assert calls == ["Remote work?"] and replay_calls == []
+    assert replay_model.cache.stats()["hits"] == 1
+
+
+def test_replay_raises_on_a_call_that_was_not_recorded(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    model, _ = counting_model(SQLiteLLMCache(path))
+    model.invoke(prompt("Remote work?", datetime(2025, 1, 1, 9)))
+
+    model.cache = SQLiteLLMCache(path, strict=True)
+    with pytest.raises(LLMCacheMiss):
+        model.invoke(prompt("Office work?", datetime(2025, 1, 1, 9)))
+
+
+def test_responses_are_evicted_in_batches_down_to_a_tenth_below_the_limit(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"))
+    model, calls = counting_model(cache)
+    model.invoke([HumanMessage(content="question 00")])
+    # Room for ten responses of the same size
+    cache.max_bytes = cache.stats()["bytes"] * 10
+
+    for index in range(1, 11):
+        model.invoke([HumanMessage(content=f"question {index:02}")])
+    assert cache.stats()["entries"] == 9
+
+    # Evicting left room for another response
+    model.invoke([HumanMessage(content="question 11")])
+    assert cache.stats()["entries"] == 10
+
+    # The least recently used responses were evicted, the others are still served from the cache
+    model.invoke([HumanMessage(content="question 02")])
+    model.invoke([HumanMessage(content="question 01")])
+    assert calls[-1] == "question 01" and calls.count("question 02") == 1
@@ -0,0 +1,72 @@
+"""A post generated incrementally has no tree blob until its last pending node is written."""
+import json
+
+import pytest
+from sqlalchemy import delete
+
+from backend.core.models import PostBranchLLM, PostLevelLLM, PostRootLLM
+from backend.core.post_expansion import store_expansion
+from backend.core.post_generator import PostGenerator
+from backend.core.post_trees import (
+    assemble_complete_post, backfill_post_tree_blobs, decode_post_tree, encode_post_tree,
+)
+from backend.db.database import SessionLocal, create_tables
+from backend.models.post import Post, PostNode
+
+
+@pytest.fixture
+def db():
+    create_tables()
+    with SessionLocal() as db:
+        yield db
+        db.execute(delete(PostNode))
+        db.execute(delete(Post))
+        db.commit()
+
+
+def store_root(db, options: int) -> tuple[Post, list[int]]:
+    root = PostRootLLM(title="Remote work", rootNode=PostLevelLLM(
+        content="Where do you work?",
+        isEnding=False,
+        options=[PostBranchLLM(text=f"Option {i}", brief=f"Brief {i}") for i in range(options)],
+    ))
+    return PostGenerator._store_post_root(db, "session", "remote work", [], root)
+
+
+def ending(content: str) -> PostLevelLLM:
+    return PostLevelLLM(content=content, isEnding=True, options=[])
+
+
+def stored_tree(db, post: Post) -> dict | None:
+    db.refresh(post)
+    return None if post.complete_tree is None else json.loads(decode_post_tree(post.complete_tree))
+
+
+def test_backfill_skips_posts_with_pending_nodes(db):
+    pending_post, _ = store_root(db, options=1)
+    complete_post, (child_id,) = store_root(db, options=1)
+    store_expansion(child_id, ending("At home"), depth=1)
+    complete_post.complete_tree = None
+    db.commit()
+
+    assert backfill_post_tree_blobs(db) == 1
+
+    assert stored_tree(db, pending_post) is None
+    tree = stored_tree(db, complete_post)
+    assert all(node["is_expanded"] for node in tree["all_nodes"].values())
+
+
+def test_expanding_a_node_clears_the_blob_while_nodes_are_pending(db):
+    post, (first_id, second_id) = store_root(db, options=2)
+    # A blob stored while the post was still partial, as backfills used to
+    post.complete_tree = encode_post_tree(assemble_complete_post(post, post.nodes))
+    db.commit()
+
+    store_expansion(first_id, ending("At home"), depth=1)
+    assert stored_tree(db, post) is None
+
+    store_expansion(second_id, ending("At the office"), depth=1)
+    tree = stored_tree(db, post)
+    assert [node["content"] for node in tree["all_nodes"].values()] == [
+        "Where do you work?", "At home", "At the office",
+    ]
@@ -0,0 +1,98 @@
+"""The research cache backends, and the lookups reported to the job telemetry."""
+import asyncio
+import time
+
+import httpx
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from backend.core.job_telemetry import usage_increments
+from benchmarks.tavily_stub import create_app as create_tavily_stub
+from research_cache import MemoryCache, ResearchCache, SQLiteCache
+from tavily_client import TavilyClient
+from telemetry import RunTelemetry
+
+
+def test_the_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ResearchCache()
+
+
+def test_memory_cache_evicts_the_least_recently_used_entries():
+    cache = MemoryCache(max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    # Reading an entry makes it recently used
+    assert cache.get("a") == "a"
+
+    cache.set("d", "d")
+
+    assert cache.get_many(["a", "b", "c", "d"]) == ["a", None, "c", "d"]
+
+
+def test_memory_cache_does_not_serve_expired_entries():
+    cache = MemoryCache(ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_async_access_round_trips(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.db"))
+
+    async def run():
+        await cache.aset_many({"a": {"n": 1}, "b": [2]})
+        return await cache.aget_many(["a", "b", "c"])
+
+    assert asyncio.run(run()) == [{"n": 1}, [2], None]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_eviction_keeps_the_most_recently_used_entries(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.db"), max_entries=10)
+    for index in range(10):
+        cache.set(f"key{index}", index)
+    # Reading an entry makes it recently used
+    time.sleep(0.01)
+    assert cache.get("key0") == 0
+
+    cache.set("key10", 10)
+
+    keys = [f"key{index}" for index in range(11)]
+    kept = [key for key, value in zip(keys, cache.get_many(keys)) if value is not None]
+    # Evicted down to a tenth below the limit, so the next insert doesn't evict again
+    assert len(kept) == 9
+    assert "key0" in kept and "key10" in kept
+    assert "key1" not in kept and "key2" not in kept
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.db"), ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_lookups_are_reported_to_the_job_telemetry():
+    transport = httpx.ASGITransport(app=create_tavily_stub(latency=0))
+    client = TavilyClient(api_key="tvly-test", base_url="http://tavily", cache=MemoryCache(), transport=transport)
+    telemetry = RunTelemetry()
+
+    async def research(_):
+        await client.search("remote work")
+        await client.search("Remote work?")
+        await client.extract(["https://example.com/a", "https://example.com/b"])
+        await client.extract(["https://example.com/a"])
+
+    async def run():
+        try:
+            await RunnableLambda(research).ainvoke(None, {"callbacks": [telemetry]})
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+    assert telemetry.research_cache == {"search": {"hits": 1, "misses": 1}, "extract": {"hits": 1, "misses": 2}}
+    increments = usage_increments(telemetry, "ok")
+    assert increments["research_cache_lookups_total", '{kind="extract",result="hit"}'] == 1
+    assert increments["research_cache_lookups_total", '{kind="extract",result="miss"}'] == 2
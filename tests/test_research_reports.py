@@ -0,0 +1,108 @@
+"""Research reports are merged by id across the post generator, supervisor, researcher and copywriter graphs."""
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+import copywriter
+import post_generator_agent
+import researcher
+import supervisor
+from benchmarks.fakes import (ScriptedChatModel, copywriter_script, current_task, final_answer, research_script,
+                              supervisor_script, tool_call, tool_results)
+from benchmarks.tavily_stub import create_app as create_tavily_stub
+from research_cache import NullCache
+from research_reports import ResearchReport, merge_research_reports
+from tavily_client import TavilyClient, set_tavily_client
+
+RESEARCH_TASKS = 2
+
+
+def report(topic: str, text: str = "Findings.", **kwargs) -> ResearchReport:
+    return ResearchReport(topic=topic, report=text, **kwargs)
+
+
+def test_merge_appends_new_reports_in_order():
+    a, b, c = report("a"), report("b"), report("c")
+    assert merge_research_reports([a, b], [c]) == [a, b, c]
+
+
+def test_merge_keeps_a_report_handed_back_once():
+    a, b = report("a"), report("b")
+    assert merge_research_reports([a, b], [a, b]) == [a, b]
+
+
+def test_merge_replaces_a_report_with_the_same_id_in_place():
+    a, b = report("a", id="1"), report("b", id="2")
+    updated = report("a", "Revised findings.", id="1")
+    assert merge_research_reports([a, b], [updated]) == [updated, b]
+
+
+def test_merge_accepts_dicts_and_missing_sides():
+    a = report("a")
+    assert merge_research_reports(None, [a.model_dump()]) == [a]
+    assert merge_research_reports([a], None) == [a]
+    assert merge_research_reports(None, None) == []
+
+
+def test_report_ids_are_derived_from_the_content():
+    assert report("a").id == report("a").id
+    assert report("a").id != report("b").id
+    assert report("a", "One.").id != report("a", "Two.").id
+
+
+def post_generator_loops(loops: int):
+    """Script for the post generator: start the post, then pick a path `loops - 1` times, then answer."""
+    def script(messages: list[BaseMessage]) -> AIMessage:
+        task = current_task(messages)
+        if "start_post_creation_process" not in tool_results(task):
+            return tool_call("start_post_creation_process", topic="Remote work")
+        chosen = sum(message.name == "handle_user_path_selection" for message in task)
+        if chosen < loops - 1:
+            return tool_call("handle_user_path_selection", chosen_path=f"Path {chosen + 1}")
+        return final_answer(messages)
+    return script
+
+
+@pytest.fixture
+def offline_agents(monkeypatch):
+    """Run every agent on a scripted model, recording the tasks the researcher writes reports on."""
+    researched = []
+
+    def recording_research_script(messages: list[BaseMessage]) -> AIMessage:
+        response = research_script(messages)
+        if response.tool_calls and response.tool_calls[0]["name"] == "generate_research_report":
+            researched.append(response.tool_calls[0]["args"]["topic"])
+        return response
+
+    def model(script) -> ScriptedChatModel:
+        return ScriptedChatModel(latency=0, script=script)
+
+    monkeypatch.setattr(supervisor, "llm_with_tools", model(supervisor_script(RESEARCH_TASKS)))
+    monkeypatch.setattr(researcher, "llm_with_tools", model(recording_research_script))
+    monkeypatch.setattr(copywriter, "llm_with_tools", model(copywriter_script))
+    return researched
+
+
+async def run_post_generator(loops: int) -> dict:
+    transport = httpx.ASGITransport(app=create_tavily_stub(latency=0))
+    set_tavily_client(TavilyClient(api_key="tvly-test", base_url="http://tavily", cache=NullCache(),
+                                   transport=transport))
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}, "recursion_limit": 200}
+    return await post_generator_agent.graph.ainvoke(
+        {"messages": [HumanMessage(content="Create a social media post with topic: Remote work")]}, config=config
+    )
+
+
+@pytest.mark.parametrize("loops", [1, 3, 5])
+def test_post_generator_stores_each_report_once(offline_agents, monkeypatch, loops):
+    monkeypatch.setattr(
+        post_generator_agent, "llm_with_tools", ScriptedChatModel(latency=0, script=post_generator_loops(loops))
+    )
+    result = asyncio.run(run_post_generator(loops))
+
+    reports = result["research_reports"]
+    assert len({report.id for report in reports}) == len(reports)
+    assert len(reports) == len(set(offline_agents)) == RESEARCH_TASKS * loops
@@ -0,0 +1,59 @@
+"""Tool latencies recorded by RunTelemetry and exported as the agent_tool_latency_seconds histogram."""
+import asyncio
+import uuid
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode
+
+from backend.core.job_telemetry import usage_increments
+from telemetry import RunTelemetry
+from tool_execution import bounded_tool
+
+
+@tool
+@bounded_tool
+async def slow_tool(seconds: float) -> str:
+    """Sleep for `seconds`."""
+    await asyncio.sleep(seconds)
+    return "done"
+
+
+def call_slow_tool(seconds: float, telemetry: RunTelemetry) -> dict:
+    message = AIMessage(content="", tool_calls=[
+        {"name": "slow_tool", "args": {"seconds": seconds}, "id": f"call_{uuid.uuid4().hex}"}
+    ])
+    return asyncio.run(ToolNode([slow_tool]).ainvoke({"messages": [message]}, config={"callbacks": [telemetry]}))
+
+
+def test_timed_out_tool_calls_are_recorded_as_timeouts(monkeypatch):
+    monkeypatch.setenv("SLOW_TOOL_TIMEOUT_SECONDS", "0.05")
+    telemetry = RunTelemetry()
+
+    call_slow_tool(0, telemetry)
+    result = call_slow_tool(1, telemetry)
+
+    assert [call["outcome"] for call in telemetry.tool_calls] == ["ok", "timeout"]
+    # The agent still gets a message it can act on
+    assert result["messages"][0].status == "error"
+    assert "timed out after 0.05 seconds" in result["messages"][0].content
+
+
+def test_tool_latencies_become_cumulative_histogram_buckets():
+    telemetry = RunTelemetry()
+    telemetry.tool_calls = [
+        {"tool": "search_web", "outcome": "ok", "seconds": 0.2},
+        {"tool": "search_web", "outcome": "ok", "seconds": 3.0},
+    ]
+    increments = usage_increments(telemetry, "ok")
+
+    def bucket(le: str) -> float:
+        return increments["agent_tool_latency_seconds_bucket", f'{{outcome="ok",tool="search_web",le="{le}"}}']
+
+    assert bucket("0.1") == 0
+    assert bucket("0.25") == 1
+    assert bucket("2.5") == 1
+    assert bucket("5") == 2
+    assert bucket("+Inf") == 2
+    assert increments["agent_tool_latency_seconds_count", '{outcome="ok",tool="search_web"}'] == 2
+    assert increments["agent_tool_latency_seconds_sum", '{outcome="ok",tool="search_web"}'] == 3.2
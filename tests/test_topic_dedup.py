@@ -0,0 +1,29 @@
+"""Topic keys coalesce rewordings of a request, but never two different requests."""
+import pytest
+
+from backend.core.topic_dedup import normalize_topic
+
+
+@pytest.mark.parametrize("topic, same", [
+    ("The Future of AI in Healthcare!", "future of ai in healthcare"),
+    ("Please write a post: the future of AI in healthcare", "The future of AI in healthcare."),
+    ("Café culture", "cafe CULTURE"),
+    ("  remote   work ", "remote work"),
+])
+def test_rewordings_share_a_key(topic, same):
+    assert normalize_topic(topic) == normalize_topic(same)
+
+
+@pytest.mark.parametrize("topic, other", [
+    ("Why remote work fails", "How remote work fails"),
+    ("What remote work fixes", "Remote work fixes"),
+    ("dog bites man", "man bites dog"),
+    ("AI for healthcare", "healthcare for AI"),
+])
+def test_different_requests_get_different_keys(topic, other):
+    assert normalize_topic(topic) != normalize_topic(other)
+
+
+def test_a_topic_of_filler_words_keeps_a_key():
+    assert normalize_topic("Please write a post") == "please write a post"
+    assert normalize_topic("!!!") == "!!!"
@@ -0,0 +1,69 @@
+"""Bounded, time-limited execution of agent tools.
+
+`ToolNode` already runs the tool calls of one turn concurrently with `asyncio.gather`, but one slow call used to
+hold back the whole turn. Decorating a tool coroutine with `bounded_tool` makes every call:
+
+- wait for a slot in a per-loop semaphore (`TOOL_MAX_CONCURRENCY`), so a burst of calls across every running
+  research task cannot flood the process,
+- run under its own timeout (`<TOOL_NAME>_TIMEOUT_SECONDS`, falling back to `TOOL_TIMEOUT_SECONDS`), raising
+  `ToolTimeout`, which `ToolNode` turns into an error message the agent can act on instead of failing the turn. Tools
+  that fan out internally, like the researcher's page extraction, time out each item on its own (e.g.
+  `EXTRACT_PAGE_TIMEOUT_SECONDS`) and return partial results.
+
+The latency and outcome (`ok`, `error` or `timeout`) of every tool call are recorded by `telemetry.RunTelemetry`, and
+exported by the API as the `agent_tool_latency_seconds` histogram (see backend/core/job_telemetry.py).
+
+The decorator goes below `@tool`, it keeps the wrapped function's signature and docstring.
+"""
+import asyncio
+import functools
+import os
+import weakref
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "16"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+# Single pages of a multi-page extraction must time out before the tool call itself, or their partial results are lost
+DEFAULT_TOOL_TIMEOUTS = {
+    "extract_page": 20.0,
+}
+
+_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+class ToolTimeout(Exception):
+    """Raised when a tool call runs out of time."""
+
+
+def get_tool_timeout(name: str) -> float:
+    return float(os.getenv(f"{name.upper()}_TIMEOUT_SECONDS", DEFAULT_TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT_SECONDS)))
+
+
+def _get_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+    return slots
+
+
+def bounded_tool(fn):
+    """Run an async tool under the shared concurrency limit and its own timeout."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        timeout = get_tool_timeout(name)
+        async with _get_slots():
+            try:
+                return await asyncio.wait_for(fn(*args, **kwargs), timeout)
+            except TimeoutError:
+                raise ToolTimeout(
+                    f"{name} timed out after {timeout:g} seconds. "
+                    "Retry with fewer inputs or continue with the results you already have."
+                ) from None
+
+    return wrapper